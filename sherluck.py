@@ -5,48 +5,1528 @@ import argparse
 import sys
 import itertools
 import os
-import requests
 import threading
 import queue
 import time
-import subprocess
 import tempfile
-from typing import List, Dict, Any, Set, Union, Tuple, Generator
+from typing import List, Dict, Any, Set, Union, Tuple, Generator, Iterable, Optional, Callable
 import re
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
 import random
+import contextlib
+import tracemalloc
+import io
+import gzip
+import lzma
+import bz2
+import heapq
+import math
+from array import array
+import hashlib
+from hashlib import blake2b
+import mmap
+import shutil
+import struct
+import functools
+import stat
+
+COMBINATION_SEPARATORS = ['', '_', '.', '-']
+PAIR_CHUNK_SIZE = 256  # (i, j) pairs per unit of work handed to a worker
+PIPE_BATCH_BYTES = 1 << 16  # candidates are written to John's stdin in batches of this size
+WRITE_BATCH_WORDS = 1 << 14  # words joined into one buffer per write by save_wordlist
+CALIBRATION_CANDIDATES = 20000  # raw candidates timed by plan_wordlist to estimate runtime
+DATE_PATTERN_NUMBERS = 4  # date concatenations (ddmmyyyy, ...) appended to each word
+NUMERIC_NUMBERS = 8  # date components and common numbers appended to each word, capped separately
+
+class SetDeduplicator:
+    """Exact de-duplication with a plain set of strings: fastest, ~60-100 bytes per word"""
+
+    def __init__(self, capacity: int = 0, fpr: float = 0.0):
+        self._seen = set()
+
+    def add(self, word: str) -> bool:
+        """Record word and return True if it had not been seen before"""
+        if word in self._seen:
+            return False
+        self._seen.add(word)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class HashDeduplicator:
+    """
+    Exact de-duplication on 64-bit BLAKE2b fingerprints stored in an
+    open-addressing array('Q') table: ~12-23 bytes per word when presized.
+    """
+
+    max_load = 0.7
+
+    def __init__(self, capacity: int = 0, fpr: float = 0.0):
+        size = 1024
+        while size * self.max_load < capacity:
+            size *= 2
+        self._table = array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    @staticmethod
+    def fingerprint(word: str) -> int:
+        # 0 marks an empty slot, so it is folded onto 1
+        return int.from_bytes(blake2b(word.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little') or 1
+
+    def add(self, word: str) -> bool:
+        return self.add_fingerprint(self.fingerprint(word))
+
+    def add_fingerprint(self, value: int) -> bool:
+        table = self._table
+        mask = self._mask
+        index = value & mask
+        slot = table[index]
+        while slot:
+            if slot == value:
+                return False
+            index = (index + 1) & mask
+            slot = table[index]
+        table[index] = value
+        self._count += 1
+        if self._count > len(table) * self.max_load:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._table
+        self._table = array('Q', bytes(16 * len(old)))
+        self._mask = len(self._table) - 1
+        self._count = 0
+        for value in old:
+            if value:
+                self.add_fingerprint(value)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class BloomDeduplicator:
+    """
+    Probabilistic de-duplication with a Bloom filter sized for `capacity`
+    words at false-positive rate `fpr` (~1.8 bytes per word at 0.1%). A false
+    positive drops a genuinely new word; past capacity the rate degrades.
+    """
+
+    def __init__(self, capacity: int = 0, fpr: float = 0.001):
+        capacity = max(capacity, 1024)
+        fpr = min(max(fpr, 1e-9), 0.5)
+        self._size = max(8, math.ceil(-capacity * math.log(fpr) / (math.log(2) ** 2)))
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+
+    def add(self, word: str) -> bool:
+        digest = blake2b(word.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self._bits
+        size = self._size
+        new = False
+        for i in range(self._hashes):
+            position = (h1 + i * h2) % size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def head_lines(buffer: bytes, count: int) -> bytes:
+    """The first `count` lines of a buffer of newline-terminated words"""
+    return b'\n'.join(buffer.split(b'\n', count)[:count]) + b'\n' if count > 0 else b''
+
+
+def _import_numpy(feature: str = '--backend numpy'):
+    try:
+        import numpy
+    except ImportError:
+        raise ValueError(f"{feature} needs the optional 'numpy' package (pip install numpy)")
+    return numpy
+
+
+class FingerprintDeduplicator(HashDeduplicator):
+    """
+    HashDeduplicator keyed by a polynomial hash of the UTF-8 bytes, which
+    composes under concatenation: H(xy) = H(x) * BASE^len(y) + H(y) (mod
+    2^64). NumpyProductEngine derives the fingerprints of whole blocks of
+    products from per-token values and checks them in one add_fingerprints()
+    call; single words still go through add(). Needs numpy.
+    """
+
+    max_load = 0.5
+    BASE = 0x100000001b3
+    MASK = (1 << 64) - 1
+    LINE_BLOCK = 1 << 18  # bytes hashed per pass by fingerprint_lines
+
+    @classmethod
+    def polynomial(cls, data: bytes) -> Tuple[int, int]:
+        """(H(data), BASE^len(data)), both mod 2^64"""
+        value = 0
+        for byte in data:
+            value = (value * cls.BASE + byte) & cls.MASK
+        return value, pow(cls.BASE, len(data), 1 << 64)
+
+    @classmethod
+    def mix(cls, value: int) -> int:
+        """splitmix64 finaliser, so the low bits used as the table index are well spread"""
+        value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & cls.MASK
+        value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & cls.MASK
+        return (value ^ (value >> 31)) or 1
+
+    @staticmethod
+    def mix_array(values):
+        """mix() over a uint64 array (wrapping arithmetic)"""
+        np = _import_numpy()
+        values = values ^ (values >> np.uint64(30))
+        values *= np.uint64(0xbf58476d1ce4e5b9)
+        values ^= values >> np.uint64(27)
+        values *= np.uint64(0x94d049bb133111eb)
+        values ^= values >> np.uint64(31)
+        values[values == 0] = 1
+        return values
+
+    @classmethod
+    def fingerprint(cls, word: str) -> int:
+        # polynomial() without the power, reduced mod 2^64 once at the end
+        # rather than per byte (the python backend calls this per candidate)
+        value = 0
+        base = cls.BASE
+        for byte in word.encode('utf-8', 'surrogateescape'):
+            value = value * base + byte
+        return cls.mix(value & cls.MASK)
+
+    @classmethod
+    def fingerprint_words(cls, words: List[str]):
+        """
+        fingerprint() of every word, as a uint64 array. Words are encoded as
+        they are written out (surrogateescape), so a word matches the bytes
+        of an output file or potfile line.
+        """
+        return cls.fingerprint_lines(('\n'.join(words) + '\n').encode('utf-8', 'surrogateescape') if words else b'')
+
+    @classmethod
+    def fingerprint_lines(cls, data: bytes):
+        """
+        fingerprint() of every newline-terminated line of `data`, as a uint64
+        array. BASE is odd, so invertible mod 2^64: with S the running sum
+        of byte * BASE^-position, the line spanning positions s..e-1 hashes
+        to BASE^(e-1) * (S[e] - S[s]). The powers are computed once, and
+        `data` is taken in blocks of about LINE_BLOCK bytes.
+        """
+        np = _import_numpy()
+        raw = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(raw == 10)
+        results = []
+        first = 0
+        while first < len(ends):
+            offset = int(ends[first - 1]) + 1 if first else 0
+            last = max(int(np.searchsorted(ends, offset + cls.LINE_BLOCK)), first + 1)
+            block_ends = ends[first:last] - offset
+            size = int(block_ends[-1])
+            powers, inverses = cls._line_powers(size)
+            sums = np.zeros(size + 1, dtype=np.uint64)
+            np.cumsum(raw[offset:offset + size] * inverses[:size], dtype=np.uint64, out=sums[1:])
+            starts = np.empty(len(block_ends), dtype=np.intp)
+            starts[0] = 0
+            starts[1:] = block_ends[:-1] + 1
+            # An empty line hashes to 0 whatever power it is scaled by
+            results.append(powers.take(np.maximum(block_ends - 1, 0))
+                           * (sums.take(block_ends) - sums.take(starts)))
+            first = last
+        if not results:
+            return np.zeros(0, dtype=np.uint64)
+        return cls.mix_array(np.concatenate(results))
+
+    @classmethod
+    def _line_powers(cls, size: int):
+        """(BASE^i, BASE^-i) for i < max(size, LINE_BLOCK), mod 2^64, cached"""
+        np = _import_numpy()
+        cached = cls.__dict__.get('_powers')
+        if cached is None or len(cached[0]) < size:
+            count = max(size, cls.LINE_BLOCK)
+            powers = np.full(count, cls.BASE, dtype=np.uint64)
+            inverses = np.full(count, pow(cls.BASE, -1, 1 << 64), dtype=np.uint64)
+            powers[0] = inverses[0] = 1
+            cached = cls._powers = (np.cumprod(powers, dtype=np.uint64), np.cumprod(inverses, dtype=np.uint64))
+        return cached
+
+    def add_fingerprints(self, values, limit: Optional[int] = None):
+        """
+        Record a uint64 array of fingerprints; returns a bool array marking
+        the ones not seen before (the first of any repeats within the array).
+        With `limit`, only the first `limit` new ones are recorded and marked.
+        """
+        np = _import_numpy()
+        new = np.zeros(len(values), dtype=bool)
+        if not len(values):
+            return new
+        first = None
+        ordered = np.sort(values)
+        if (ordered[1:] == ordered[:-1]).any():
+            order = np.argsort(values, kind='stable')
+            first = np.ones(len(values), dtype=bool)
+            first[order[1:]] = values[order[1:]] != values[order[:-1]]
+        if limit is not None and (len(values) if first is None else int(first.sum())) > limit:
+            # Find what is new without recording it, then record only the first `limit`
+            unseen = ~self.contains(values)
+            if first is not None:
+                unseen &= first
+            candidates = np.flatnonzero(unseen)
+            if len(candidates) > limit:
+                first = np.zeros(len(values), dtype=bool)
+                first[candidates[:limit]] = True
+        if first is not None:
+            new[first] = self._insert(values[first])
+        else:
+            new = self._insert(values)
+        return new
+
+    def values(self):
+        """Every recorded fingerprint, as a uint64 array in table order"""
+        np = _import_numpy()
+        table = np.frombuffer(self._table, dtype=np.uint64)
+        return table[table != 0]
+
+    def contains(self, values):
+        """Bool array marking which of a uint64 array of fingerprints are recorded"""
+        np = _import_numpy()
+        table = np.frombuffer(self._table, dtype=np.uint64)
+        found = np.zeros(len(values), dtype=bool)
+        rows = np.arange(len(values))
+        slots = (values & np.uint64(self._mask)).astype(np.intp)
+        while rows.size:
+            current = table.take(slots)
+            hit = current == values
+            found[rows[hit]] = True
+            probe = (current != 0) & ~hit
+            slots = (slots[probe] + 1) & self._mask
+            rows = rows[probe]
+            values = values[probe]
+        return found
+
+    def _insert(self, values):
+        """Vectorised add_fingerprint for values that are distinct from each other"""
+        np = _import_numpy()
+        while self._count + len(values) > len(self._table) * self.max_load:
+            self._grow()
+        table = np.frombuffer(self._table, dtype=np.uint64)
+        mask = np.uint64(self._mask)
+        new = np.zeros(len(values), dtype=bool)
+        rows = np.arange(len(values))
+        slots = (values & mask).astype(np.intp)
+        while rows.size:
+            current = table.take(slots)
+            empty = current == 0
+            claimed = slots[empty]
+            table[claimed] = values[empty]
+            # Several values may have claimed the same empty slot; one wins
+            won = empty.copy()
+            won[empty] = table.take(claimed) == values[empty]
+            new[rows[won]] = True
+            # Lost races retry the same slot, values behind other values probe on
+            retry = ~won & (current != values)
+            slots = np.where(empty, slots, (slots + 1) & self._mask)[retry]
+            rows = rows[retry]
+            values = values[retry]
+        self._count += int(new.sum())
+        return new
+
+    def _grow(self):
+        np = _import_numpy()
+        old = np.frombuffer(self._table, dtype=np.uint64)
+        values = old[old != 0].copy()
+        del old
+        self._table = array('Q', bytes(16 * len(self._table)))
+        self._mask = len(self._table) - 1
+        self._count = 0
+        self._insert(values)
+
+
+DEDUP_BACKENDS = {
+    'set': SetDeduplicator,
+    'hash': HashDeduplicator,
+    'bloom': BloomDeduplicator,
+}
+
+def make_deduplicator(kind: str = 'set', capacity: int = 0, fpr: float = 0.001):
+    if kind not in DEDUP_BACKENDS:
+        raise ValueError(f"Unknown dedup backend: {kind} (choose from {', '.join(DEDUP_BACKENDS)})")
+    return DEDUP_BACKENDS[kind](capacity, fpr)
+
+
+class WordlistIndex:
+    """
+    Read-only, memory-mapped index over a preprocessed external wordlist.
+
+    File layout (native byte order, all integers uint64):
+
+        header   magic, source size, source mtime_ns, word count
+        buckets  (start, count) into the length array for lengths 0..MAX_LENGTH
+        ranked   one entry per unique word, in source (frequency) order
+        lengths  the same entries grouped by character length
+        blob     the unique words, UTF-8, newline separated
+
+    Each entry packs offset << 16 | char_length << 8 | byte_length, so words
+    are sliced straight out of the mapping and only decoded when yielded.
+    """
+
+    MAGIC = b'SHLKIDX1'
+    MAX_LENGTH = 64
+    HEADER = struct.Struct('<8sQQQ')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.source_size, self.source_mtime_ns, self._count = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Sherluck wordlist index")
+        view = memoryview(self._map)
+        position = self.HEADER.size
+        table_size = 2 * (self.MAX_LENGTH + 1) * 8
+        self._buckets = view[position:position + table_size].cast('Q')
+        position += table_size
+        self._ranked = view[position:position + self._count * 8].cast('Q')
+        position += self._count * 8
+        self._by_length = view[position:position + self._count * 8].cast('Q')
+        self._blob = view[position + self._count * 8:]
+
+    @classmethod
+    def build(cls, source_path: str, index_path: str) -> 'WordlistIndex':
+        """Preprocess a text wordlist: strip, de-duplicate, bucket by length"""
+        stat = os.stat(source_path)
+        seen = HashDeduplicator(stat.st_size // 10)
+        ranked = array('Q')
+        lengths = [array('Q') for _ in range(cls.MAX_LENGTH + 1)]
+        directory = os.path.dirname(os.path.abspath(index_path))
+        
+        with tempfile.TemporaryFile(dir=directory) as blob, open(source_path, 'rb') as source:
+            offset = 0
+            for line in source:
+                word = line.decode('utf-8', 'ignore').strip()
+                if not word or len(word) > cls.MAX_LENGTH or not seen.add(word):
+                    continue
+                encoded = word.encode('utf-8')
+                if len(encoded) > 255:
+                    continue
+                entry = offset << 16 | len(word) << 8 | len(encoded)
+                ranked.append(entry)
+                lengths[len(word)].append(entry)
+                blob.write(encoded + b'\n')
+                offset += len(encoded) + 1
+            
+            buckets = array('Q')
+            start = 0
+            for bucket in lengths:
+                buckets.extend((start, len(bucket)))
+                start += len(bucket)
+            
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    out.write(cls.HEADER.pack(cls.MAGIC, stat.st_size, stat.st_mtime_ns, len(ranked)))
+                    buckets.tofile(out)
+                    ranked.tofile(out)
+                    for bucket in lengths:
+                        bucket.tofile(out)
+                    blob.seek(0)
+                    shutil.copyfileobj(blob, out, 1 << 20)
+                os.replace(tmp_path, index_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return cls(index_path)
+
+    def is_current(self, source_path: str) -> bool:
+        stat = os.stat(source_path)
+        return (stat.st_size, stat.st_mtime_ns) == (self.source_size, self.source_mtime_ns)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _word(self, entry: int) -> str:
+        offset = entry >> 16
+        return str(self._blob[offset:offset + (entry & 0xff)], 'utf-8')
+
+    def length_range(self, min_length: int = 1, max_length: int = MAX_LENGTH) -> Tuple[int, int]:
+        """Slice of the length-bucketed array holding words of min..max characters"""
+        min_length = max(min_length, 0)
+        max_length = min(max_length, self.MAX_LENGTH)
+        if min_length > max_length:
+            return 0, 0
+        start = self._buckets[2 * min_length]
+        return start, self._buckets[2 * max_length] + self._buckets[2 * max_length + 1]
+
+    def top(self, count: int, min_length: int = 1, max_length: int = MAX_LENGTH) -> Generator[str, None, None]:
+        """The first `count` words within the length limits, in source (frequency) order"""
+        if count <= 0:
+            return
+        for entry in self._ranked:
+            if min_length <= (entry >> 8) & 0xff <= max_length:
+                yield self._word(entry)
+                count -= 1
+                if count <= 0:
+                    return
+
+    def top_size(self, count: int, min_length: int = 1, max_length: int = MAX_LENGTH) -> Tuple[int, int]:
+        """(words, bytes with newlines) that top() would yield, without decoding them"""
+        words = size = 0
+        if count <= 0:
+            return words, size
+        for entry in self._ranked:
+            if min_length <= (entry >> 8) & 0xff <= max_length:
+                words += 1
+                size += (entry & 0xff) + 1
+                if words >= count:
+                    break
+        return words, size
+
+    def by_length(self, min_length: int = 1, max_length: int = MAX_LENGTH,
+                  count: Optional[int] = None) -> Generator[str, None, None]:
+        """Words of min..max characters, shortest first"""
+        start, stop = self.length_range(min_length, max_length)
+        if count is not None:
+            stop = min(stop, start + count)
+        for entry in self._by_length[start:stop]:
+            yield self._word(entry)
+
+    def sample(self, count: int, min_length: int = 1, max_length: int = MAX_LENGTH,
+               seed: Optional[int] = None) -> List[str]:
+        """A uniform random sample of distinct words of min..max characters"""
+        start, stop = self.length_range(min_length, max_length)
+        picks = random.Random(seed).sample(range(start, stop), min(count, stop - start))
+        return [self._word(self._by_length[index]) for index in picks]
+
+    def close(self):
+        for name in ('_buckets', '_ranked', '_by_length', '_blob'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+        self._file.close()
+
+
+class ExclusionIndex:
+    """
+    Candidates already tried against one target, kept across runs so a
+    repeat run only emits new ones.
+
+    The file holds a header (magic, count) and the sorted, unique
+    FingerprintDeduplicator fingerprints of every word recorded so far:
+    words a run emitted, recorded as they go out, and John potfile
+    passwords, which take effect as soon as they are imported. Either
+    backend seeds a FingerprintDeduplicator with them, so they cost nothing
+    per candidate. Nothing is written until save(). Needs numpy.
+    """
+
+    MAGIC = b'SHLKEXC1'
+    HEADER = struct.Struct('<8sQ')
+
+    def __init__(self, path: str):
+        np = _import_numpy('--exclusion-index')
+        self.path = path
+        self._values = np.zeros(0, dtype=np.uint64)
+        self._pending = []
+        self._emitted = array('Q')
+        self._table = None
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                magic, count = self.HEADER.unpack(f.read(self.HEADER.size))
+                if magic != self.MAGIC:
+                    raise ValueError(f"{path} is not a Sherluck exclusion index")
+                self._values = np.fromfile(f, dtype=np.uint64, count=count)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def seed(self, deduplicator: FingerprintDeduplicator):
+        """Mark every recorded word as already seen"""
+        deduplicator.add_fingerprints(self._values)
+
+    def keep(self, words: List[str]):
+        """Bool array marking the words that were not recorded before"""
+        np = _import_numpy()
+        if not len(self._values):
+            return np.ones(len(words), dtype=bool)
+        if self._table is None:
+            self._table = FingerprintDeduplicator(len(self._values))
+            self._table.add_fingerprints(self._values)
+        return ~self._table.contains(FingerprintDeduplicator.fingerprint_words(words))
+
+    def record(self, value: int):
+        """Record the fingerprint of a word emitted this run"""
+        self._emitted.append(value)
+
+    def record_fingerprints(self, values):
+        """record() for a uint64 array of fingerprints"""
+        self._pending.append(values)
+
+    def import_potfile(self, path: str) -> int:
+        """Record the passwords of a John potfile ($HEX[...] decoded); returns how many"""
+        lines = []
+        with open(path, 'rb') as f:
+            for line in f:
+                password = line.rstrip(b'\r\n').partition(b':')[2]
+                if password.startswith(b'$HEX[') and password.endswith(b']'):
+                    try:
+                        password = bytes.fromhex(password[5:-1].decode('ascii'))
+                    except ValueError:
+                        continue
+                if b'\n' not in password:
+                    lines.append(password + b'\n')
+        if lines:
+            # Excluded from this run already, not just after save()
+            self._values = self._merge([self._values, FingerprintDeduplicator.fingerprint_lines(b''.join(lines))])
+            self._table = None
+        return len(lines)
+
+    @staticmethod
+    def _merge(arrays: List[Any]):
+        """Sorted union of uint64 arrays, the first already sorted and unique"""
+        np = _import_numpy()
+        # Timsort merges the sorted runs instead of re-sorting them
+        values = np.concatenate([arrays[0]] + [np.sort(array) for array in arrays[1:]])
+        values.sort(kind='stable')
+        if len(values) > 1:
+            values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+        return values
+
+    def save(self) -> int:
+        """Merge what was recorded into the file; returns how many words are new this run"""
+        np = _import_numpy()
+        if self._emitted:
+            self._pending.append(np.frombuffer(self._emitted, dtype=np.uint64))
+            self._emitted = array('Q')
+        before = len(self._values)
+        self._values = self._merge([self._values] + self._pending)
+        self._pending = []
+        self._table = None
+        
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(self._values)))
+            self._values.tofile(f)
+        os.replace(temporary, self.path)
+        return len(self._values) - before
+
+
+class PipelineStats:
+    """
+    Per-stage wall time and counters for one run, reported by --stats.
+
+    Hot loops keep plain local integers and add them here in bulk, so
+    instrumentation costs nothing per candidate beyond an integer increment.
+    """
+
+    COUNTERS = ('produced', 'deduplicated', 'filtered', 'truncated')
 
-class Sherluck:
     def __init__(self):
-        self.leet_speak_map = {
-            'a': ['@', '4', '^', '/\\', 'λ'],
-            'b': ['8', '6', '|3', 'ß'],
-            'c': ['(', '<', '{', '[', '©'],
-            'd': ['|)', '|]', 'Ð'],
-            'e': ['3', '&', '€', '£'],
-            'f': ['|=', 'ƒ', 'ph'],
-            'g': ['6', '9', '&'],
-            'h': ['#', '|-|', '}{'],
-            'i': ['1', '!', '|', ']['],
-            'j': ['_|', '_/', ']'],
-            'k': ['X', '|<', '|{'],
-            'l': ['1', '|', '7', '|_'],
-            'm': ['|\\/|', '/\\/\\', '[V]'],
-            'n': ['|\\|', '/\\/', '[\\]'],
-            'o': ['0', '()', '[]', '°'],
-            'p': ['|*', '|o', '|>'],
-            'q': ['(_,)', '()_', '0_'],
-            'r': ['|2', '|?', '|^'],
-            's': ['5', '$', '§', 'z'],
-            't': ['7', '+', '†'],
-            'u': ['|_|', '(_)', '\\_\\'],
-            'v': ['\\/', '|/', '\\|'],
-            'w': ['\\/\\/', 'VV', '\\N'],
-            'x': ['><', '}{', ')('],
-            'y': ['`/', '¥', '\\|/'],
-            'z': ['2', '%', 's']
+        self.started = time.time()
+        self.stages = {}
+        self.extra = {}
+
+    def stage(self, name: str) -> Dict[str, Any]:
+        if name not in self.stages:
+            self.stages[name] = dict.fromkeys(self.COUNTERS, 0)
+            self.stages[name]['seconds'] = 0.0
+        return self.stages[name]
+
+    def add(self, name: str, seconds: float = 0.0, **counts: int):
+        stage = self.stage(name)
+        if seconds:
+            stage['seconds'] += seconds
+        for counter, value in counts.items():
+            stage[counter] += value
+
+    def timed_with(self, name: str, other: str):
+        """Report stage `name` as timed within `other` rather than with a time of its own"""
+        stage = self.stage(name)
+        stage.pop('seconds', None)
+        stage['timed_with'] = other
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self.stage(name)
+        finally:
+            self.stage(name)['seconds'] += time.perf_counter() - start
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.time() - self.started
+        emitted = self.extra.get('emitted', 0)
+        return {
+            'elapsed_seconds': round(elapsed, 6),
+            'words_per_second': round(emitted / elapsed, 1) if elapsed > 0 else None,
+            'stages': {name: {key: round(value, 6) if isinstance(value, float) else value
+                              for key, value in stage.items()}
+                       for name, stage in self.stages.items()},
+            **self.extra,
         }
+
+    def save(self, filename: str):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"[+] Stats written to {filename}")
+
+
+class ProgressLine:
+    """
+    Rate-limited progress on stderr: a single rewritten line on a terminal,
+    an occasional plain line otherwise. Callers only invoke update() every
+    few thousand items, and it prints at most once per `interval` seconds.
+    """
+
+    def __init__(self, label: str, interval: float = 1.0, stream=None):
+        self.label = label
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self._last = self.started
+        self._tty = self.stream.isatty()
+        self._dirty = False
+
+    def update(self, count: int):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        rate = count / (now - self.started)
+        line = f"[+] {self.label}: {count:,} ({rate:,.0f}/s)"
+        if self._tty:
+            self.stream.write(f"\r{line}\033[K")
+            self._dirty = True
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def finish(self):
+        if self._dirty:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._dirty = False
+
+
+class WordlistWriter:
+    """
+    Batched wordlist output: words are joined and encoded a batch at a time
+    and written as large byte buffers, optionally compressed and split into
+    numbered shards of `split_every` words. filename '-' writes to `stream`
+    (stdout by default). With `append_offset`, an existing plain file is cut
+    back to that many bytes and appended to, which is how --resume continues.
+
+    Compression is gzip, xz or bz2 from the standard library, or zstd when
+    the optional `zstandard` package is installed. When not given, it is
+    inferred from the file extension.
+    """
+
+    EXTENSIONS = {'.gz': 'gzip', '.xz': 'xz', '.bz2': 'bz2', '.zst': 'zstd'}
+
+    def __init__(self, filename: str, compression: Optional[str] = None,
+                 split_every: Optional[int] = None, stream=None, append_offset: Optional[int] = None):
+        if compression is None:
+            compression = self.EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError("zstd output needs the optional 'zstandard' package (pip install zstandard)")
+        elif compression not in (None, 'gzip', 'xz', 'bz2'):
+            raise ValueError(f"Unknown compression: {compression}")
+        if filename == '-' and split_every:
+            raise ValueError("--split-every needs a file name, not stdout")
+        if append_offset is not None and (compression or split_every or filename == '-'):
+            raise ValueError("Only a single uncompressed output file can be appended to")
+        
+        self.filename = filename
+        self.compression = compression
+        self.split_every = split_every if split_every and split_every > 0 else None
+        self.stream = stream
+        self.files = []
+        self.append_offset = append_offset
+        self.bytes_written = append_offset or 0
+        self.words_written = 0
+        self._raw = None
+        self._out = None
+        self._shard_words = 0
+
+    def shard_path(self, index: int) -> str:
+        """out.txt.gz -> out.003.txt.gz"""
+        directory, name = os.path.split(self.filename)
+        stem, dot, extensions = name.partition('.')
+        return os.path.join(directory, f"{stem}.{index:03d}{dot}{extensions}")
+
+    def _open(self):
+        if self.filename == '-':
+            path = '-'
+            # sys.__stdout__: main() points sys.stdout at stderr while writing to stdout
+            self._raw = self.stream or sys.__stdout__.buffer
+        elif self.append_offset is not None:
+            path = self.filename
+            self._raw = open(path, 'r+b')
+            self._raw.truncate(self.append_offset)
+            self._raw.seek(self.append_offset)
+        else:
+            path = self.shard_path(len(self.files)) if self.split_every else self.filename
+            self._raw = open(path, 'wb')
+        
+        if self.compression == 'gzip':
+            self._out = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        elif self.compression == 'xz':
+            self._out = lzma.LZMAFile(self._raw, 'wb')
+        elif self.compression == 'bz2':
+            self._out = bz2.BZ2File(self._raw, 'wb')
+        elif self.compression == 'zstd':
+            import zstandard
+            self._out = zstandard.ZstdCompressor(level=3).stream_writer(self._raw, closefd=False)
+        else:
+            self._out = self._raw
+        self.files.append(path)
+        self._shard_words = 0
+
+    def _close_current(self):
+        if self._out is None:
+            return
+        if self._out is not self._raw:
+            self._out.close()
+        if self.filename == '-':
+            self._raw.flush()
+        else:
+            self._raw.close()
+        self._out = self._raw = None
+
+    def write(self, words: List[str]):
+        """Write a batch of words, one per line"""
+        while words:
+            if self._out is None:
+                self._open()
+            batch = words
+            if self.split_every:
+                room = self.split_every - self._shard_words
+                batch, words = words[:room], words[room:]
+            else:
+                words = []
+            self._write_data(('\n'.join(batch) + '\n').encode('utf-8', 'surrogateescape'), len(batch))
+
+    def write_encoded(self, data: bytes):
+        """Write a buffer of already encoded, newline-terminated words"""
+        while data:
+            if self._out is None:
+                self._open()
+            if self.split_every:
+                room = self.split_every - self._shard_words
+                lines = data.split(b'\n', room)
+                if len(lines) > room and lines[room]:
+                    self._write_data(b'\n'.join(lines[:room]) + b'\n', room)
+                    data = lines[room]
+                    continue
+            self._write_data(data, data.count(b'\n'))
+            data = b''
+
+    def _write_data(self, data: bytes, words: int):
+        self._out.write(data)
+        self.bytes_written += len(data)
+        self.words_written += words
+        self._shard_words += words
+        if self.split_every and self._shard_words >= self.split_every:
+            self._close_current()
+
+    def flush(self):
+        """Push everything written so far to disk (the compressed stream is only synced, not ended)"""
+        if self._out is None:
+            return
+        self._out.flush()
+        self._raw.flush()
+        if self.filename != '-':
+            os.fsync(self._raw.fileno())
+
+    def close(self):
+        if not self.files:
+            # An empty run still leaves an (empty) output behind
+            self._open()
+        self._close_current()
+
+    def __enter__(self) -> 'WordlistWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_wordlist(path: str) -> Generator[str, None, None]:
+    """Words of a file written by WordlistWriter, decompressing by extension"""
+    compression = WordlistWriter.EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if compression == 'gzip':
+        f = gzip.open(path, 'rb')
+    elif compression == 'xz':
+        f = lzma.open(path, 'rb')
+    elif compression == 'bz2':
+        f = bz2.open(path, 'rb')
+    elif compression == 'zstd':
+        import zstandard
+        f = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    else:
+        f = open(path, 'rb')
+    with f:
+        for line in f:
+            yield line.rstrip(b'\n').decode('utf-8', 'surrogateescape')
+
+
+class GenerationCheckpoint:
+    """
+    Periodic record of how far a generate_wordlist -> save_wordlist run got,
+    kept next to the output as <output>.ckpt so --resume can continue it.
+
+    generate_wordlist calls mark() at every chunk boundary with the words
+    emitted so far and its position; save_wordlist resolves the latest mark
+    to a byte offset once the batch containing it is written, and saves it
+    at most every `interval` seconds. Resuming cuts the output back to that
+    offset and rebuilds the deduplicator from the words before it: every
+    backend holds exactly the emitted words, so replaying them in order
+    restores it bit for bit without serialising it separately.
+    """
+
+    VERSION = 2
+
+    def __init__(self, output: str, fingerprint: str, interval: float = 60.0):
+        self.output = output
+        self.path = output + '.ckpt'
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.resume = None
+        self._pending = None
+        self._state = None
+        self._saved = time.monotonic()
+
+    @staticmethod
+    def make_fingerprint(data: Dict[str, Any], options: Dict[str, Any]) -> str:
+        """Stable digest of everything that decides the output (unlike hash(), not salted per process)"""
+        payload = json.dumps({'version': GenerationCheckpoint.VERSION, 'chunk': PAIR_CHUNK_SIZE,
+                              'data': data, 'options': options}, sort_keys=True, default=str)
+        return blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    @classmethod
+    def load(cls, output: str, fingerprint: str, interval: float = 60.0) -> 'GenerationCheckpoint':
+        checkpoint = cls(output, fingerprint, interval)
+        with open(checkpoint.path, 'r') as f:
+            state = json.load(f)
+        if state.get('version') != cls.VERSION or state.get('fingerprint') != fingerprint:
+            raise ValueError(f"{checkpoint.path} was written for a different profile or options")
+        if not os.path.exists(output) or os.path.getsize(output) < state['offset']:
+            raise ValueError(f"{output} is shorter than its checkpoint; it was changed since")
+        checkpoint.resume = state
+        checkpoint._state = state
+        return checkpoint
+
+    @property
+    def words(self) -> int:
+        return self.resume['words'] if self.resume else 0
+
+    @property
+    def offset(self) -> Optional[int]:
+        return self.resume['offset'] if self.resume else None
+
+    def written_words(self) -> Generator[str, None, None]:
+        """The words before the resume offset, in output order"""
+        if not self.resume:
+            return
+        count = 0
+        with open(self.output, 'rb') as f:
+            remaining = self.offset
+            tail = b''
+            while remaining > 0:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    break
+                remaining -= len(block)
+                lines = (tail + block).split(b'\n')
+                tail = lines.pop()
+                for line in lines:
+                    count += 1
+                    yield line.decode('utf-8', 'surrogateescape')
+        if tail or count != self.words:
+            raise ValueError(f"{self.output} does not match its checkpoint; it was changed since")
+
+    def mark(self, words: int, position: Dict[str, Any]):
+        """Called by the generator: `words` have been emitted and the next one comes from `position`"""
+        self._pending = (words, position)
+
+    def written(self, batch: Union[List[str], bytes], first: int, offset: int, writer: 'WordlistWriter'):
+        """
+        Called after each batch (a list of words or an encoded buffer) is
+        written, with the batch's first word number and byte offset; resolves
+        a mark that fell inside it and saves if due.
+        """
+        size = batch.count(b'\n') if isinstance(batch, bytes) else len(batch)
+        if self._pending is not None and self._pending[0] <= first + size:
+            words, position = self._pending
+            self._pending = None
+            head = words - first
+            if isinstance(batch, bytes):
+                offset += sum(map(len, batch.split(b'\n', head)[:head])) + head
+            else:
+                offset += sum(len(word.encode('utf-8', 'surrogateescape')) + 1 for word in batch[:head])
+            self._state = {'version': self.VERSION, 'fingerprint': self.fingerprint,
+                           'words': words, 'offset': offset, 'position': position,
+                           'saved': datetime.now().isoformat(timespec='seconds')}
+        if self._state is not None and time.monotonic() - self._saved >= self.interval:
+            writer.flush()
+            self.save()
+
+    def save(self) -> bool:
+        if self._state is None:
+            return False
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(temporary, self.path)
+        self._saved = time.monotonic()
+        return True
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Leet substitutions per character; LeetEngine compiles them once per process
+LEET_SPEAK_MAP = {
+    'a': ['@', '4', '^', '/\\', 'λ'],
+    'b': ['8', '6', '|3', 'ß'],
+    'c': ['(', '<', '{', '[', '©'],
+    'd': ['|)', '|]', 'Ð'],
+    'e': ['3', '&', '€', '£'],
+    'f': ['|=', 'ƒ', 'ph'],
+    'g': ['6', '9', '&'],
+    'h': ['#', '|-|', '}{'],
+    'i': ['1', '!', '|', ']['],
+    'j': ['_|', '_/', ']'],
+    'k': ['X', '|<', '|{'],
+    'l': ['1', '|', '7', '|_'],
+    'm': ['|\\/|', '/\\/\\', '[V]'],
+    'n': ['|\\|', '/\\/', '[\\]'],
+    'o': ['0', '()', '[]', '°'],
+    'p': ['|*', '|o', '|>'],
+    'q': ['(_,)', '()_', '0_'],
+    'r': ['|2', '|?', '|^'],
+    's': ['5', '$', '§', 'z'],
+    't': ['7', '+', '†'],
+    'u': ['|_|', '(_)', '\\_\\'],
+    'v': ['\\/', '|/', '\\|'],
+    'w': ['\\/\\/', 'VV', '\\N'],
+    'x': ['><', '}{', ')('],
+    'y': ['`/', '¥', '\\|/'],
+    'z': ['2', '%', 's']
+}
+
+# The most common single-character substitutions, applied to the whole word
+SIMPLE_LEET_SUBS = {
+    'a': '@', 'e': '3', 'i': '1', 'o': '0', 's': '$', 't': '7'
+}
+
+
+class LeetEngine:
+    """
+    Leet variations of a word, memoised per word with an LRU cache.
+
+    The maps are compiled once into str.translate tables (one per simple
+    substitution, plus one applying all of them) and per-character option
+    tuples. After the case forms and whole-word passes, substitutions at
+    individual positions are enumerated lazily, fewest positions first: each
+    set of up to `depth` positions is walked as a mixed-radix counter over
+    their options. Enumeration stops at `budget` distinct variations, of
+    which budget // (depth + 1) are reserved for each of the substitution
+    sizes 2..depth (so the earlier forms can't use up the budget); a
+    reservation a word has no room for goes to the earlier forms.
+    """
+
+    def __init__(self, depth: int = 1, budget: int = 8, options_per_char: int = 2,
+                 leet_map: Dict[str, List[str]] = None, simple_subs: Dict[str, str] = None,
+                 cache_size: int = 1 << 16):
+        if depth > 1 and budget // (depth + 1) == 0:
+            raise ValueError(f"a leet depth of {depth} needs a budget of at least {depth + 1}")
+        leet_map = LEET_SPEAK_MAP if leet_map is None else leet_map
+        simple_subs = SIMPLE_LEET_SUBS if simple_subs is None else simple_subs
+        self.depth = depth
+        self.budget = budget
+        self._reserved = budget // (depth + 1) if depth > 1 else 0
+        self._simple = [(char, str.maketrans({char: replacement})) for char, replacement in simple_subs.items()]
+        self._all_simple = str.maketrans(simple_subs)
+        self._options = {}
+        for char, replacements in leet_map.items():
+            options = tuple(replacements[:options_per_char])
+            self._options[char] = self._options[char.upper()] = options
+        self.variations = functools.lru_cache(maxsize=cache_size)(self._variations)
+
+    def _variations(self, word: str) -> Tuple[str, ...]:
+        variations = {}
+        if not word or self.budget <= 0:
+            return ()
+        slots = [(position, self._options[char]) for position, char in enumerate(word) if char in self._options]
+        depth = max(1, min(self.depth, len(slots)))
+        tiers = [itertools.chain(self._whole_word(word), self._positional(word, slots, 1))]
+        tiers += [self._positional(word, slots, size) for size in range(2, depth + 1)]
+        for tier, candidates in enumerate(tiers):
+            # Room up to here: the whole budget less what later tiers keep
+            limit = self.budget - self._reserved * (depth - 1 - tier)
+            if len(variations) >= limit:
+                continue
+            for candidate in candidates:
+                variations[candidate] = None
+                if len(variations) >= limit:
+                    break
+        return tuple(variations)
+
+    def _whole_word(self, word: str) -> Generator[str, None, None]:
+        yield word
+        yield word.lower()
+        yield word.upper()
+        yield word.capitalize()
+        
+        lower = word.lower()
+        present = 0
+        for char, table in self._simple:
+            if char in lower:
+                present += 1
+                new_word = lower.translate(table)
+                yield new_word
+                yield new_word.capitalize()
+        if present > 1:
+            new_word = lower.translate(self._all_simple)
+            yield new_word
+            yield new_word.capitalize()
+
+    @staticmethod
+    def _positional(word: str, slots: List[Tuple[int, Tuple[str, ...]]], size: int) -> Generator[str, None, None]:
+        """Substitutions at every set of `size` positions"""
+        for chosen in itertools.combinations(slots, size):
+            radices = [len(options) for _, options in chosen]
+            for index in range(math.prod(radices)):
+                chars = list(word)
+                for (position, options), radix in zip(chosen, radices):
+                    index, digit = divmod(index, radix)
+                    chars[position] = options[digit]
+                yield ''.join(chars)
+
+
+class DateEngine:
+    """
+    Parsing and expansion of date field values, memoised per value.
+
+    Each accepted layout is a precompiled regex: year-month-day,
+    day-month-year (month first when only that reading is valid) and compact
+    yyyymmdd, separated by '-', '/' or '.'. A parsed date expands into its
+    components (year, 2-digit year, month, day) and the concatenations in
+    FORMS; a value that doesn't parse contributes its digit groups only.
+    """
+
+    LAYOUTS = [
+        (re.compile(r'(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})'), ('year', 'month', 'day')),
+        (re.compile(r'(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})'), ('day', 'month', 'year')),
+        (re.compile(r'(\d{4})(\d{2})(\d{2})'), ('year', 'month', 'day')),
+    ]
+    DIGITS = re.compile(r'\d+')
+    # Concatenations people use as passwords, most common first
+    FORMS = ['{yyyy}', '{dd}{mm}{yyyy}', '{yy}', '{dd}{mm}', '{mm}{dd}', '{dd}{mm}{yy}', '{mm}{dd}{yy}',
+             '{yyyy}{mm}{dd}', '{mm}{dd}{yyyy}', '{yy}{mm}{dd}', '{mm}{yyyy}', '{mm}{yy}']
+
+    def __init__(self, cache_size: int = 4096):
+        self.parse = functools.lru_cache(maxsize=cache_size)(self._parse)
+        self.expand = functools.lru_cache(maxsize=cache_size)(self._expand)
+
+    def _parse(self, value: str) -> Optional[Tuple[int, int, int]]:
+        """(year, month, day) of a value in one of LAYOUTS, else None"""
+        value = value.strip()
+        for pattern, order in self.LAYOUTS:
+            match = pattern.fullmatch(value)
+            if match is None:
+                continue
+            parts = dict(zip(order, map(int, match.groups())))
+            if order[0] == 'day' and parts['day'] <= 12 < parts['month']:
+                parts['day'], parts['month'] = parts['month'], parts['day']
+            try:
+                datetime(parts['year'], parts['month'], parts['day'])
+            except ValueError:
+                return None
+            return parts['year'], parts['month'], parts['day']
+        return None
+
+    def _expand(self, value: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """(components, concatenations) of one value"""
+        parsed = self.parse(value)
+        if parsed is None:
+            return tuple(self.DIGITS.findall(value)), ()
+        year, month, day = parsed
+        pieces = {'yyyy': f'{year:04d}', 'yy': f'{year % 100:02d}', 'mm': f'{month:02d}', 'dd': f'{day:02d}'}
+        components = (pieces['yyyy'], pieces['yy'], pieces['mm'], pieces['dd'])
+        return components, tuple(form.format(**pieces) for form in self.FORMS)
+
+    def components(self, values: Iterable[str]) -> Set[str]:
+        return {component for value in values for component in self.expand(value)[0]}
+
+    def patterns(self, values: Iterable[str]) -> List[str]:
+        """Concatenations of all values, form by form, so every date's year comes before any ddmmyyyy"""
+        expanded = [patterns for value in values for patterns in (self.expand(value)[1],) if patterns]
+        return list(dict.fromkeys(itertools.chain.from_iterable(zip(*expanded))))
+
+
+def md4(data: bytes) -> bytes:
+    """MD4 (RFC 1320), for NT hashes where OpenSSL no longer provides it"""
+    mask = 0xffffffff
+
+    def rotate(value: int, bits: int) -> int:
+        value &= mask
+        return ((value << bits) | (value >> (32 - bits))) & mask
+
+    bit_length = len(data) * 8
+    data += b'\x80' + b'\x00' * ((55 - len(data)) % 64) + struct.pack('<Q', bit_length)
+    a, b, c, d = 0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476
+    for offset in range(0, len(data), 64):
+        x = struct.unpack('<16I', data[offset:offset + 64])
+        aa, bb, cc, dd = a, b, c, d
+        for i in (0, 4, 8, 12):
+            a = rotate(a + ((b & c) | (~b & d)) + x[i], 3)
+            d = rotate(d + ((a & b) | (~a & c)) + x[i + 1], 7)
+            c = rotate(c + ((d & a) | (~d & b)) + x[i + 2], 11)
+            b = rotate(b + ((c & d) | (~c & a)) + x[i + 3], 19)
+        for i in (0, 1, 2, 3):
+            a = rotate(a + ((b & c) | (b & d) | (c & d)) + x[i] + 0x5a827999, 3)
+            d = rotate(d + ((a & b) | (a & c) | (b & c)) + x[i + 4] + 0x5a827999, 5)
+            c = rotate(c + ((d & a) | (d & b) | (a & b)) + x[i + 8] + 0x5a827999, 9)
+            b = rotate(b + ((c & d) | (c & a) | (d & a)) + x[i + 12] + 0x5a827999, 13)
+        for i in (0, 2, 1, 3):
+            a = rotate(a + (b ^ c ^ d) + x[i] + 0x6ed9eba1, 3)
+            d = rotate(d + (a ^ b ^ c) + x[i + 8] + 0x6ed9eba1, 9)
+            c = rotate(c + (d ^ a ^ b) + x[i + 4] + 0x6ed9eba1, 11)
+            b = rotate(b + (c ^ d ^ a) + x[i + 12] + 0x6ed9eba1, 15)
+        a, b, c, d = (a + aa) & mask, (b + bb) & mask, (c + cc) & mask, (d + dd) & mask
+    return struct.pack('<4I', a, b, c, d)
+
+
+def _nt_digest(data: bytes) -> bytes:
+    encoded = data.decode('utf-8', 'surrogateescape').encode('utf-16-le', 'surrogatepass')
+    try:
+        return hashlib.new('md4', encoded).digest()
+    except ValueError:
+        return md4(encoded)
+
+
+class CandidateShard:
+    """
+    Shard `index` of `count` (--shard): the candidates whose fingerprint
+    (see FingerprintDeduplicator) falls in it, taken from the high 32 bits
+    since the low bits index the deduplicator's table. A word's shard
+    depends on the word alone, so each node builds and deduplicates only
+    its own share, in any order, and the shards are disjoint. Words are
+    fingerprinted with numpy when it is installed and one at a time in
+    pure Python otherwise; the shards are the same either way.
+    """
+
+    def __init__(self, index: int, count: int):
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index} of {count}")
+        self.index = index
+        self.count = count
+        try:
+            self.np = _import_numpy('--shard')
+        except ValueError:
+            self.np = None
+
+    def mask(self, fingerprints):
+        """Bool array marking which of a uint64 array of fingerprints are in this shard"""
+        np = _import_numpy('--shard')
+        return (fingerprints >> np.uint64(32)) % np.uint64(self.count) == np.uint64(self.index)
+
+    def keep(self, words: List[str]) -> List[bool]:
+        """Bools marking the words in this shard"""
+        if self.np is not None:
+            return self.mask(FingerprintDeduplicator.fingerprint_words(words)).tolist()
+        fingerprint = FingerprintDeduplicator.fingerprint
+        count = self.count
+        index = self.index
+        return [(fingerprint(word) >> 32) % count == index for word in words]
+
+    def filter(self, words: Iterable[str]) -> Generator[str, None, None]:
+        """The words in this shard, read ahead in batches"""
+        iterator = iter(words)
+        while True:
+            batch = list(itertools.islice(iterator, WRITE_BATCH_WORDS))
+            if not batch:
+                return
+            yield from itertools.compress(batch, self.keep(batch))
+
+
+class HashVerifier:
+    """
+    In-process check of candidates against target hashes of the fast
+    unsalted formats, run while the wordlist is still being generated.
+
+    Target digests are loaded into a set; watch() passes the word stream
+    through unchanged while handing batches of it to a process pool that
+    digests them with hashlib. Hits are printed as they come back and
+    appended to a potfile in John's format (tagged ciphertext:password),
+    so `john --pot=FILE` skips them.
+    """
+
+    # Digest of the UTF-8 bytes, digest size, John's ciphertext tag
+    FORMATS = {
+        'raw-md5': (lambda data: hashlib.md5(data).digest(), 16, '$dynamic_0$'),
+        'raw-sha1': (lambda data: hashlib.sha1(data).digest(), 20, '$dynamic_26$'),
+        'raw-sha256': (lambda data: hashlib.sha256(data).digest(), 32, '$SHA256$'),
+        'nt': (_nt_digest, 16, '$NT$'),
+    }
+    BATCH_WORDS = 1 << 13
+
+    def __init__(self, format_type: str, potfile: str, workers: int = 1):
+        if format_type not in self.FORMATS:
+            raise ValueError(f"Unknown hash format: {format_type} (choose from {', '.join(self.FORMATS)})")
+        self.format = format_type
+        self.potfile = potfile
+        self.workers = workers
+        self.targets = set()
+        self.cracked = {}
+        self.checked = 0
+
+    def load(self, path: str) -> int:
+        """
+        Read target hashes, one per line: bare hex, John-tagged, user:hash or
+        pwdump (user:rid:lm:nt:::, NT field used). Returns how many were read.
+        """
+        _, size, tag = self.FORMATS[self.format]
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.strip().split(':')
+                if self.format == 'nt' and len(fields) >= 4 and fields[1].isdigit():
+                    fields = [fields[3]]
+                for field in fields[1:] + fields[:1]:
+                    if field.lower().startswith(tag.lower()):
+                        field = field[len(tag):]
+                    if len(field) == 2 * size and re.fullmatch(r'[0-9a-fA-F]+', field):
+                        self.targets.add(bytes.fromhex(field))
+                        break
+        return len(self.targets)
+
+    def watch(self, words: Iterable[Union[str, bytes]],
+              limit: Optional[int] = None) -> Generator[Union[str, bytes], None, None]:
+        """
+        Yield `words` unchanged (words or encoded buffers) while checking
+        them; close() it once done to wait for the last batches. With a
+        `limit`, stop after that many words, cutting a buffer short the way
+        save_wordlist does, so only words that get written are checked.
+        """
+        pending = deque()
+        batch = []
+        executor = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hash_worker,
+                                           initargs=(self.format, self.targets))
+        else:
+            _init_hash_worker(self.format, self.targets)
+
+        def submit(items: List[Union[str, bytes]]):
+            if executor is None:
+                self._record(_verify_hash_batch(items))
+                return
+            pending.append(executor.submit(_verify_hash_batch, items))
+            while pending and (len(pending) >= self.workers * 4 or pending[0].done()):
+                self._record(pending.popleft().result())
+
+        try:
+            try:
+                remaining = limit
+                for item in words:
+                    if remaining is not None:
+                        if remaining <= 0:
+                            break
+                        size = item.count(b'\n') if isinstance(item, bytes) else 1
+                        if size > remaining:
+                            item = head_lines(item, remaining)
+                            size = remaining
+                        remaining -= size
+                    batch.append(item)
+                    yield item
+                    if isinstance(item, bytes) or len(batch) >= self.BATCH_WORDS:
+                        submit(batch)
+                        batch = []
+            except GeneratorExit:
+                # Closed by a consumer that stopped early (at max_words); the words it took still count
+                pass
+            if batch:
+                submit(batch)
+            while pending:
+                self._record(pending.popleft().result())
+        finally:
+            if hasattr(words, 'close'):
+                words.close()
+            if executor is not None:
+                for future in pending:
+                    future.cancel()
+                executor.shutdown(wait=True)
+
+    def _record(self, result: Tuple[int, List[Tuple[bytes, str]]]):
+        checked, hits = result
+        self.checked += checked
+        tag = self.FORMATS[self.format][2]
+        fresh = []
+        for digest, word in hits:
+            if digest not in self.cracked:
+                self.cracked[digest] = word
+                fresh.append(f"{tag}{digest.hex()}:{self.pot_password(word)}\n")
+                print(f"[+] Cracked {digest.hex()}: {word}", flush=True)
+        if fresh:
+            with open(self.potfile, 'a', encoding='utf-8', errors='surrogateescape') as f:
+                f.writelines(fresh)
+
+    @staticmethod
+    def pot_password(word: str) -> str:
+        """John writes passwords it can't store verbatim as $HEX[...]"""
+        data = word.encode('utf-8', 'surrogateescape')
+        if any(byte < 0x20 or byte == 0x7f for byte in data) or word.startswith('$HEX['):
+            return f"$HEX[{data.hex()}]"
+        return word
+
+    def report(self):
+        print(f"[+] Checked {self.checked} candidates against {len(self.targets)} {self.format} hashes: "
+              f"{len(self.cracked)} cracked" + (f", written to {self.potfile}" if self.cracked else ""))
+
+
+class BudgetPlanner:
+    """
+    Exact stage sizes of generate_wordlist without generating a word.
+
+    Variations are reduced to a histogram over (character length, weight)
+    holding [count, bytes]. Pairing convolves it with itself, and separators
+    and numeric forms shift it, so the length limits just select buckets:
+    every stage's count and size before deduplication is exact (an upper
+    bound on what survives it). plan() then spends max_words on the highest
+    weights first, across the 'words' (single variations and their numeric
+    forms), 'pairs' and 'common' stages and across keyword groups; the
+    weight threshold it stops at is where ranked output would have stopped.
+    """
+
+    STAGES = ('words', 'pairs', 'common')
+
+    def __init__(self, variations: List[Tuple[str, float, str]], numbers: List[str],
+                 min_length: int, max_length: int):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.numbers = numbers
+        self.groups = {}
+        for word, weight, group in variations:
+            self._add(self.groups.setdefault(group, {}), len(word), weight, 1,
+                      len(word.encode('utf-8', 'surrogateescape')))
+        self.variations = {}
+        for histogram in self.groups.values():
+            for (chars, weight), (count, size) in histogram.items():
+                self._add(self.variations, chars, weight, count, size)
+
+    @staticmethod
+    def _add(histogram: Dict[Tuple[int, float], List[int]], chars: int, weight: float, count: int, size: int):
+        bucket = histogram.setdefault((chars, round(weight, 9)), [0, 0])
+        bucket[0] += count
+        bucket[1] += size
+
+    def _pairs(self, group: Dict[Tuple[int, float], List[int]]) -> Dict[Tuple[int, float], List[int]]:
+        """Ordered pairs (first word from `group`, second any other variation) joined by each separator"""
+        pairs = {}
+        for (chars1, weight1), (count1, size1) in group.items():
+            for (chars2, weight2), (count2, size2) in self.variations.items():
+                self._add(pairs, chars1 + chars2, (weight1 + weight2) / 2,
+                          count1 * count2, size1 * count2 + count1 * size2)
+            # A word is never paired with itself
+            self._add(pairs, 2 * chars1, weight1, -count1, -2 * size1)
+        combinations = {}
+        for separator in COMBINATION_SEPARATORS:
+            for (chars, weight), (count, size) in pairs.items():
+                self._add(combinations, chars + len(separator), weight, count, size + count * len(separator))
+        return combinations
+
+    def _numeric(self, histogram: Dict[Tuple[int, float], List[int]]) -> Dict[Tuple[int, float], List[int]]:
+        """The four numeric forms of every word per number, see Sherluck.numeric_expansions"""
+        forms = {}
+        for number in self.numbers:
+            for affix in (number, number, f"_{number}", f"_{number}"):
+                affix_bytes = len(affix.encode('utf-8'))
+                for (chars, weight), (count, size) in histogram.items():
+                    self._add(forms, chars + len(affix), weight * 0.9, count, size + count * affix_bytes)
+        return forms
+
+    def _select(self, *histograms: Dict[Tuple[int, float], List[int]]) -> Tuple[int, Dict[float, List[int]]]:
+        """(raw count, {weight: [count, bytes with newlines]} within the length limits)"""
+        raw = 0
+        selected = {}
+        for histogram in histograms:
+            for (chars, weight), (count, size) in histogram.items():
+                raw += count
+                if self.min_length <= chars <= self.max_length:
+                    bucket = selected.setdefault(weight, [0, 0])
+                    bucket[0] += count
+                    bucket[1] += size + count
+        return raw, selected
+
+    def plan(self, max_words: int, common_count: int = 0, common_bytes: int = 0,
+             common_weight: float = 0.5) -> Dict[str, Any]:
+        entries = []
+        stages = {stage: {'raw': 0, 'in_range': 0, 'bytes': 0, 'allocated': 0, 'allocated_bytes': 0}
+                  for stage in self.STAGES}
+        groups = {}
+        for group, histogram in self.groups.items():
+            combinations = self._pairs(histogram)
+            for stage, histograms in (('words', (histogram, self._numeric(histogram))),
+                                      ('pairs', (combinations, self._numeric(combinations)))):
+                raw, selected = self._select(*histograms)
+                stages[stage]['raw'] += raw
+                for weight, (count, size) in selected.items():
+                    stages[stage]['in_range'] += count
+                    stages[stage]['bytes'] += size
+                    entries.append((weight, stage, group, count, size))
+            groups[group] = {'variations': sum(count for count, _ in histogram.values()), 'allocated': 0}
+        if common_count:
+            stages['common'].update(raw=common_count, in_range=common_count, bytes=common_bytes)
+            entries.append((common_weight, 'common', None, common_count, common_bytes))
+
+        remaining = max_words
+        threshold = None
+        # Highest weight first; at equal weight, stages in generation order
+        for weight, stage, group, count, size in sorted(entries, key=lambda entry: (-entry[0], self.STAGES.index(entry[1]))):
+            if remaining <= 0:
+                break
+            taken = min(count, remaining)
+            remaining -= taken
+            threshold = weight
+            stages[stage]['allocated'] += taken
+            stages[stage]['allocated_bytes'] += size * taken // count
+            if group is not None:
+                groups[group]['allocated'] += taken
+        return {
+            'max_words': max_words,
+            'stages': stages,
+            'groups': groups,
+            'threshold': threshold,
+            'words': max_words - remaining,
+            'bytes': sum(stage['allocated_bytes'] for stage in stages.values()),
+        }
+
+
+class Sherluck:
+    def __init__(self):
+        self.leet_speak_map = LEET_SPEAK_MAP
         
         self.common_suffixes = [
             '123', '1234', '12345', '123456', 
@@ -66,11 +1546,29 @@ class Sherluck:
             'secret', 'hidden', 'private', 'secure'
         ]
 
+        # Simple leet substitutions (most common) and the affixes used by
+        # apply_prefixes_suffixes; emit_rules encodes the same tables as rules
+        self.simple_leet_subs = SIMPLE_LEET_SUBS
+        self.leet = LeetEngine()
+        self.dates = DateEngine()
+        self.affix_suffixes = ['123', '1234', '1', '2', '!', '']
+        self.affix_prefixes = ['', '!', '1', '2']
+
         self.common_wordlists = {
             'rockyou': 'https://github.com/brannondorsey/naive-hashcat/releases/download/data/rockyou.txt',
             'common_passwords': 'https://raw.githubusercontent.com/danielmiessler/SecLists/master/Passwords/Common-Credentials/10-million-password-list-top-1000000.txt',
             'english_words': 'https://raw.githubusercontent.com/dwyl/english-words/master/words_alpha.txt'
         }
+        # Expected SHA-256 per wordlist name, checked by download_wordlist
+        self.wordlist_checksums = {}
+        self.cache_dir = os.environ.get('SHERLUCK_CACHE_DIR', 'wordlists')
+        self.refresh_wordlists = False
+        # Memory-mapped WordlistIndex per downloaded wordlist, see open_wordlist_index
+        self.wordlist_indexes = {}
+        # Once set (--serve, after startup), the indexes are only read: no
+        # downloads, staleness checks or rebuilds that would swap them under
+        # another thread
+        self.wordlists_frozen = False
 
         # John the Ripper commands database
         self.john_commands = {
@@ -83,6 +1581,7 @@ class Sherluck:
             'specific_format': 'john --format={format} --wordlist={wordlist} {target}',
             'multi_crack': 'john --wordlist={wordlist} {target1} {target2} {target3}'
         }
+        self.john_binary = 'john'
 
     def run_john_the_ripper(self, command_key: str, wordlist_path: str, target_files: List[str], 
                            format_type: str = None, rules: bool = False) -> None:
@@ -106,55 +1605,313 @@ class Sherluck:
         
         print(f"[+] Executing John the Ripper: {command}")
         
+        import subprocess
+        try:
+            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+        except Exception as e:
+            print(f"[!] Failed to execute John the Ripper: {e}")
+            return
+        
+        reader = self._stream_john_output(process)
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=3600)
-            print(f"[+] John output:\n{result.stdout}")
-            if result.stderr:
-                print(f"[!] John errors:\n{result.stderr}")
+            process.wait(timeout=3600)
         except subprocess.TimeoutExpired:
+            process.kill()
             print("[!] John the Ripper execution timed out after 1 hour")
+        reader.join()
+        if process.returncode:
+            print(f"[!] John exited with status {process.returncode}")
+
+    @staticmethod
+    def _stream_john_output(process: 'subprocess.Popen') -> threading.Thread:
+        """Echo John's combined stdout/stderr line by line while it runs"""
+        def pump():
+            for line in process.stdout:
+                print(f"[john] {line.decode('utf-8', 'replace').rstrip()}", flush=True)
+            process.stdout.close()
+        
+        reader = threading.Thread(target=pump, daemon=True)
+        reader.start()
+        return reader
+
+    def run_john_pipe(self, wordlist_generator: Iterable[str], target_files: List[str],
+                      format_type: str = None, rules: bool = False) -> int:
+        """
+        Start John reading candidates from stdin (--pipe when rules are used,
+        --stdin otherwise) and feed it straight from the generator.
+
+        Words are written in PIPE_BATCH_BYTES batches; a full pipe blocks the
+        write, so generation never runs ahead of John by more than the pipe
+        buffer. Returns the number of words John accepted on its input.
+        """
+        command = [self.john_binary, '--pipe' if rules else '--stdin']
+        if rules:
+            command.append('--rules')
+        if format_type:
+            command.append(f'--format={format_type}')
+        command.extend(target_files)
+        print(f"[+] Piping candidates into John the Ripper: {' '.join(command)}")
+        
+        import subprocess
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
         except Exception as e:
             print(f"[!] Failed to execute John the Ripper: {e}")
+            return 0
+        
+        reader = self._stream_john_output(process)
+        stdin = process.stdin
+        progress = ProgressLine("Fed to John")
+        count = 0
+        batch = []
+        batch_bytes = 0
+        try:
+            for word in wordlist_generator:
+                encoded = word.encode('utf-8', 'surrogateescape')
+                batch.append(encoded)
+                batch_bytes += len(encoded) + 1
+                if batch_bytes >= PIPE_BATCH_BYTES:
+                    batch.append(b'')
+                    stdin.write(b'\n'.join(batch))
+                    count += len(batch) - 1
+                    batch = []
+                    batch_bytes = 0
+                    progress.update(count)
+            if batch:
+                batch.append(b'')
+                stdin.write(b'\n'.join(batch))
+                count += len(batch) - 1
+        except BrokenPipeError:
+            print("[!] John closed its input early; stopping generation")
+        finally:
+            if hasattr(wordlist_generator, 'close'):
+                wordlist_generator.close()
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+        
+        progress.finish()
+        process.wait()
+        reader.join()
+        print(f"[+] Fed {count} words to John (exit status {process.returncode})")
+        return count
+
+    def _read_cache_meta(self, path: str) -> Dict[str, Any]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache_meta(self, path: str, meta: Dict[str, Any]):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
 
-    def download_wordlist(self, name: str, url: str, output_dir: str = "wordlists") -> str:
+    def download_wordlist(self, name: str, url: str, output_dir: str = None,
+                          checksum: str = None, refresh: bool = None) -> str:
+        """
+        Fetch a wordlist into the download cache and return its path.
+
+        Data is streamed into <name>.txt.part and renamed into place only once
+        complete and verified, so a cached <name>.txt is always whole. An
+        interrupted download resumes with an HTTP Range request (guarded by
+        If-Range); one with no ETag or Last-Modified to guard it restarts. <name>.txt.meta.json records the URL, ETag, Last-Modified,
+        size and SHA-256. With refresh set, a cached copy is revalidated with
+        a conditional request. The download fails if `checksum` (or
+        self.wordlist_checksums[name]) is set and doesn't match.
+        """
+        output_dir = output_dir or self.cache_dir
+        refresh = self.refresh_wordlists if refresh is None else refresh
+        checksum = (checksum or self.wordlist_checksums.get(name) or '').lower() or None
         os.makedirs(output_dir, exist_ok=True)
         filename = os.path.join(output_dir, f"{name}.txt")
+        part_path = f"{filename}.part"
+        meta_path = f"{filename}.meta.json"
+        meta = self._read_cache_meta(meta_path)
         
         if os.path.exists(filename):
-            return filename
-            
+            if meta.get('url') != url or not meta.get('sha256'):
+                # Left behind by an older version or another source: it may be
+                # truncated, and with no validator to resume against, it is
+                # fetched again from scratch
+                print(f"[!] Cached {name} wordlist has no download record; downloading again")
+                os.remove(filename)
+                meta = {}
+            elif checksum and meta['sha256'] != checksum:
+                print(f"[!] Cached {name} wordlist does not match the expected checksum; downloading again")
+                os.remove(filename)
+                meta = {}
+            elif os.path.getsize(filename) != meta.get('size'):
+                print(f"[!] Cached {name} wordlist changed on disk; downloading again")
+                os.remove(filename)
+                meta = {}
+            elif not refresh:
+                return filename
+        
+        headers = {}
+        part_meta = {}
+        resume_from = 0
+        if os.path.exists(filename):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        elif os.path.exists(part_path):
+            part_meta = self._read_cache_meta(f"{part_path}.meta.json")
+            resume_from = os.path.getsize(part_path)
+            validator = part_meta.get('etag') or part_meta.get('last_modified')
+            if resume_from and part_meta.get('url') == url and validator:
+                headers['Range'] = f"bytes={resume_from}-"
+                headers['If-Range'] = validator
+            else:
+                # Appending without a validator could splice two different files
+                resume_from = 0
+        
+        import requests
         try:
-            print(f"[+] Downloading {name} wordlist...")
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
+            response = requests.get(url, stream=True, headers=headers, timeout=(10, 60))
+            if response.status_code == 304:
+                print(f"[+] Cached {name} wordlist is up to date")
+                return filename
+            if response.status_code == 416 and resume_from:
+                # The partial file already holds the whole body
+                response.close()
+                response = None
+            else:
+                response.raise_for_status()
+            
+            source = response.headers if response is not None else {
+                'ETag': part_meta.get('etag'), 'Last-Modified': part_meta.get('last_modified')}
+            new_meta = {
+                'url': url,
+                'etag': source.get('ETag'),
+                'last_modified': source.get('Last-Modified'),
+            }
+            if response is not None:
+                if response.status_code == 206:
+                    print(f"[+] Resuming {name} wordlist download at {resume_from} bytes...")
+                    mode = 'ab'
+                else:
+                    print(f"[+] Downloading {name} wordlist...")
+                    mode = 'wb'
+                self._write_cache_meta(f"{part_path}.meta.json", new_meta)
+                
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
             
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            new_meta['size'] = os.path.getsize(part_path)
+            new_meta['sha256'] = self._file_sha256(part_path)
+            if checksum and new_meta['sha256'] != checksum:
+                os.remove(part_path)
+                if os.path.exists(f"{part_path}.meta.json"):
+                    os.remove(f"{part_path}.meta.json")
+                print(f"[!] Checksum mismatch for {name} wordlist: expected {checksum}, got {new_meta['sha256']}")
+                return None
             
+            os.replace(part_path, filename)
+            self._write_cache_meta(meta_path, new_meta)
+            if os.path.exists(f"{part_path}.meta.json"):
+                os.remove(f"{part_path}.meta.json")
             print(f"[+] Downloaded {name} wordlist to {filename}")
             return filename
         except Exception as e:
+            if os.path.exists(filename):
+                print(f"[!] Could not revalidate {name} wordlist ({e}); using cached copy")
+                return filename
             print(f"[!] Failed to download {name} wordlist: {e}")
             return None
 
-    def load_external_wordlists(self, wordlist_names: List[str], max_words: int = 10000) -> Generator[str, None, None]:
+    def open_wordlist_index(self, name: str, filename: str) -> Optional[WordlistIndex]:
+        """Open (building or rebuilding when stale) the index next to a downloaded wordlist"""
+        index = self.wordlist_indexes.get(name)
+        if index is not None and index.is_current(filename):
+            return index
+        if index is not None:
+            index.close()
+        
+        index_path = f"{filename}.idx"
+        index = None
+        try:
+            if os.path.exists(index_path):
+                index = WordlistIndex(index_path)
+                if not index.is_current(filename):
+                    index.close()
+                    index = None
+        except (OSError, ValueError, struct.error):
+            index = None
+        
+        try:
+            if index is None:
+                print(f"[+] Indexing {name} wordlist (one-time)...")
+                start = time.time()
+                index = WordlistIndex.build(filename, index_path)
+                print(f"[+] Indexed {len(index)} unique words in {time.time() - start:.1f}s")
+        except OSError as e:
+            print(f"[!] Failed to index {name} wordlist: {e}")
+            return None
+        
+        self.wordlist_indexes[name] = index
+        return index
+
+    def load_external_wordlists(self, wordlist_names: List[str], max_words: int = 10000,
+                                min_length: int = 4, max_length: int = 30) -> Generator[str, None, None]:
         for name in wordlist_names:
             if name in self.common_wordlists:
+                if self.wordlists_frozen:
+                    index = self.wordlist_indexes.get(name)
+                else:
+                    filename = self.download_wordlist(name, self.common_wordlists[name])
+                    index = self.open_wordlist_index(name, filename) if filename else None
+                if index is not None:
+                    yield from index.top(max_words, min_length, max_length)
+
+    def common_capacity(self, wordlist_names: List[str], max_words: int = 10000, min_length: int = 4,
+                        max_length: int = 30, download: bool = True) -> Optional[Tuple[int, int]]:
+        """
+        (words, bytes) load_external_wordlists would yield before deduplication.
+        Without `download`, only lists already cached and indexed are counted,
+        and None is returned if any of them is missing.
+        """
+        words = size = 0
+        for name in wordlist_names:
+            if name not in self.common_wordlists:
+                continue
+            if self.wordlists_frozen:
+                index = self.wordlist_indexes.get(name)
+            elif download:
                 filename = self.download_wordlist(name, self.common_wordlists[name])
-                if filename:
-                    try:
-                        count = 0
-                        with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
-                            for line in f:
-                                word = line.strip()
-                                if word and 4 <= len(word) <= 30:
-                                    yield word
-                                    count += 1
-                                    if count >= max_words:
-                                        break
-                    except Exception as e:
-                        print(f"[!] Error reading {name} wordlist: {e}")
+                index = self.open_wordlist_index(name, filename) if filename else None
+            else:
+                filename = os.path.join(self.cache_dir, f"{name}.txt")
+                index = self.wordlist_indexes.get(name)
+                try:
+                    if index is None and os.path.exists(f"{filename}.idx"):
+                        index = self.wordlist_indexes[name] = WordlistIndex(f"{filename}.idx")
+                    if index is None or not index.is_current(filename):
+                        return None
+                except (OSError, ValueError, struct.error):
+                    return None
+            if index is not None:
+                count, length = index.top_size(max_words, min_length, max_length)
+                words += count
+                size += length
+        return words, size
 
     def load_data(self, filename: str) -> Dict[str, Any]:
         try:
@@ -174,59 +1931,24 @@ class Sherluck:
             return data
         return [data]
 
-    def generate_realistic_leet_variations(self, word: str, max_variations: int = 8) -> Generator[str, None, None]:
-        """Generate more realistic leet variations with mixed complexity"""
-        if not word or len(word) == 0:
-            return
-        
-        # Original word variations
-        yield word
-        yield word.lower()
-        yield word.upper()
-        yield word.capitalize()
-        
-        variations_generated = 4
-        
-        # Simple leet substitutions (most common)
-        simple_leet = word.lower()
-        simple_subs = {
-            'a': '@', 'e': '3', 'i': '1', 'o': '0', 's': '$', 't': '7'
-        }
-        
-        for char, replacement in simple_subs.items():
-            if char in simple_leet and variations_generated < max_variations:
-                new_word = simple_leet.replace(char, replacement)
-                yield new_word
-                variations_generated += 1
-                # Also capitalize first letter
-                yield new_word.capitalize()
-                variations_generated += 1
-
-        # Moderate complexity variations
-        if len(word) <= 6 and variations_generated < max_variations:
-            for i in range(min(2, len(word))):
-                char = word[i].lower()
-                if char in self.leet_speak_map:
-                    for replacement in self.leet_speak_map[char][:2]:  # Limit to 2 replacements per char
-                        if variations_generated >= max_variations:
-                            return
-                        new_word = word[:i] + replacement + word[i+1:]
-                        yield new_word
-                        variations_generated += 1
+    def generate_realistic_leet_variations(self, word: str, max_variations: Optional[int] = None) -> Generator[str, None, None]:
+        """Generate more realistic leet variations with mixed complexity (see LeetEngine)"""
+        variations = self.leet.variations(word)
+        yield from variations if max_variations is None else variations[:max_variations]
 
     def apply_prefixes_suffixes(self, word: str, max_combinations: int = 12) -> Generator[str, None, None]:
         yield word
         count = 1
         
         # Common suffixes (most realistic first)
-        for suffix in ['123', '1234', '1', '2', '!', '']:
+        for suffix in self.affix_suffixes:
             if count >= max_combinations:
                 return
             yield f"{word}{suffix}"
             count += 1
         
         # Common prefixes
-        for prefix in ['', '!', '1', '2']:
+        for prefix in self.affix_prefixes:
             if count >= max_combinations:
                 return
             yield f"{prefix}{word}"
@@ -242,44 +1964,38 @@ class Sherluck:
             yield combo
             count += 1
 
-    def extract_dates_from_data(self, data: Dict[str, Any]) -> Set[str]:
-        dates = set()
-        
+    def date_values(self, data: Dict[str, Any]) -> List[str]:
+        """Raw values of the date fields, in field order"""
         date_fields = ['birthdate', 'anniversary', 'important_date', 
                       'child_birthdate', 'children_birthdates', 'spouse_birthdate',
                       'marriage_date', 'graduation_date', 'employment_date']
         
+        values = []
         for field in date_fields:
             field_data = data.get(field)
             if field_data:
-                for item in self.ensure_list(field_data):
-                    dates.update(self.parse_date(str(item)))
-        
-        return dates
+                values.extend(str(item) for item in self.ensure_list(field_data))
+        return values
+
+    def extract_dates_from_data(self, data: Dict[str, Any]) -> Set[str]:
+        return self.dates.components(self.date_values(data))
+
+    def date_numbers(self, data: Dict[str, Any]) -> List[str]:
+        """The numbers the numeric stage appends and prepends, see numeric_numbers"""
+        values = self.date_values(data)
+        return self.numeric_numbers(self.dates.components(values), self.dates.patterns(values))
 
     def parse_date(self, date_str: str) -> Set[str]:
-        components = set()
-        
-        try:
-            for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y']:
-                try:
-                    date_obj = datetime.strptime(date_str, fmt)
-                    components.update([
-                        str(date_obj.year),
-                        str(date_obj.year)[2:],
-                        str(date_obj.month).zfill(2),
-                        str(date_obj.day).zfill(2),
-                    ])
-                    break
-                except ValueError:
-                    continue
-        except:
-            numbers = re.findall(r'\d+', date_str)
-            components.update(numbers)
-        
-        return components
+        return set(self.dates.expand(date_str)[0])
+
+    def extract_keywords(self, data: Dict[str, Any], weights: Dict[str, float] = None,
+                         date_components: Optional[Set[str]] = None) -> Generator[Tuple[str, float], None, None]:
+        for _, word, weight in self.extract_keyword_groups(data, weights, date_components):
+            yield (word, weight)
 
-    def extract_keywords(self, data: Dict[str, Any], weights: Dict[str, float] = None) -> Generator[Tuple[str, float], None, None]:
+    def extract_keyword_groups(self, data: Dict[str, Any], weights: Dict[str, float] = None,
+                               date_components: Optional[Set[str]] = None) -> Generator[Tuple[str, str, float], None, None]:
+        """extract_keywords as (group, word, weight): the field category, or 'dates'"""
         if weights is None:
             weights = {}
             
@@ -308,11 +2024,12 @@ class Sherluck:
                     weight = weights.get(field, weights.get(category, default_weight))
                     for item in self.ensure_list(field_data):
                         if item and str(item).strip():
-                            yield (str(item).strip(), weight)
+                            yield (category, str(item).strip(), weight)
         
-        date_components = self.extract_dates_from_data(data)
-        for date_component in date_components:
-            yield (date_component, weights.get('dates', default_weight))
+        if date_components is None:
+            date_components = self.extract_dates_from_data(data)
+        for date_component in sorted(date_components):
+            yield ('dates', date_component, weights.get('dates', default_weight))
 
     def generate_word_variations(self, word: str, weight: float) -> Generator[Tuple[str, float], None, None]:
         # Yield original word variations
@@ -322,9 +2039,8 @@ class Sherluck:
         yield (word.capitalize(), weight * 0.9)
         
         # Generate realistic leet variations
-        leet_variations = set()
-        for leet_word in self.generate_realistic_leet_variations(word):
-            leet_variations.add(leet_word)
+        # dict keeps first-seen order, so output doesn't depend on string hashing
+        leet_variations = dict.fromkeys(self.generate_realistic_leet_variations(word))
         
         for leet_word in leet_variations:
             yield (leet_word, weight * 0.8)
@@ -337,150 +2053,1621 @@ class Sherluck:
         for ps_word in self.apply_prefixes_suffixes(word, 4):
             yield (ps_word, weight * 0.7)
 
-    def generate_combinations(self, keywords: List[Tuple[str, float]], max_combinations: int = 20000) -> Generator[Tuple[str, float], None, None]:
-        if not keywords:
-            return
-            
-        # First yield all individual words
-        seen_combinations = set()
-        count = 0
-        
-        for word, weight in keywords:
-            if word not in seen_combinations:
-                yield (word, weight)
-                seen_combinations.add(word)
-                count += 1
-                if count >= max_combinations:
-                    return
-        
-        separators = ['', '_', '.', '-']
-        
-        # Generate 2-word combinations
-        for i in range(len(keywords)):
-            for j in range(i + 1, len(keywords)):
-                if count >= max_combinations:
-                    return
-                
-                word1, weight1 = keywords[i]
-                word2, weight2 = keywords[j]
+    def collect_variations(self, keywords: Iterable[Tuple[str, float]],
+                           stats: Optional[PipelineStats] = None,
+                           sources: Optional[Dict[str, int]] = None) -> List[Tuple[str, float]]:
+        """
+        Expand keywords into their unique variations, keeping the first weight
+        seen. `sources`, if given, is filled with each variation's keyword
+        index, again the first seen.
+        """
+        variations = {}
+        produced = 0
+        for index, (word, weight) in enumerate(keywords):
+            for variation, var_weight in self.generate_word_variations(word, weight):
+                produced += 1
+                if variation not in variations:
+                    variations[variation] = var_weight
+                    if sources is not None:
+                        sources[variation] = index
+        if stats is not None:
+            stats.add('variations', produced=produced, deduplicated=produced - len(variations))
+        return list(variations.items())
+
+    @staticmethod
+    def iter_pair_combinations(keywords: List[Tuple[str, float]], start: int = 0,
+                               stop: Optional[int] = None) -> Generator[Tuple[str, float], None, None]:
+        """
+        Raw 2-word combinations for pairs start..stop of the (i, j) triangle,
+        numbered row by row: (0, 1), (0, 2), ..., (1, 2), ...
+        """
+        count = len(keywords)
+        if stop is None:
+            stop = Sherluck.pair_count(count)
+        index = start
+        i, j = Sherluck.pair_position(count, start)
+        while index < stop:
+            word1, weight1 = keywords[i]
+            row_stop = min(count, j + stop - index)
+            for word2, weight2 in keywords[j:row_stop]:
                 total_weight = (weight1 + weight2) / 2
-                
-                for sep in separators:
-                    combo1 = f"{word1}{sep}{word2}"
-                    if combo1 not in seen_combinations:
-                        yield (combo1, total_weight)
-                        seen_combinations.add(combo1)
-                        count += 1
-                        if count >= max_combinations:
-                            return
-                    
-                    combo2 = f"{word2}{sep}{word1}"
-                    if combo2 not in seen_combinations:
-                        yield (combo2, total_weight)
-                        seen_combinations.add(combo2)
-                        count += 1
-                        if count >= max_combinations:
-                            return
+                for sep in COMBINATION_SEPARATORS:
+                    yield (f"{word1}{sep}{word2}", total_weight)
+                    yield (f"{word2}{sep}{word1}", total_weight)
+            index += row_stop - j
+            i += 1
+            j = i + 1
+
+    @staticmethod
+    def pair_count(count: int) -> int:
+        return count * (count - 1) // 2
 
-    def add_numeric_patterns(self, words: List[Tuple[str, float]], date_components: Set[str], max_patterns: int = 10000) -> Generator[Tuple[str, float], None, None]:
-        numbers = list(date_components)
+    @staticmethod
+    def pair_position(count: int, index: int) -> Tuple[int, int]:
+        """Map a row-major pair index back to its (i, j)"""
+        low, high = 0, max(count - 1, 0)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if mid * (2 * count - mid - 1) // 2 <= index:
+                low = mid
+            else:
+                high = mid - 1
+        return low, low + 1 + index - low * (2 * count - low - 1) // 2
+
+    @staticmethod
+    def chunk_ranges(total: int, chunk_size: int, first: int = 0) -> Generator[Tuple[int, int], None, None]:
+        """[start, stop) ranges of chunk_size covering 0..total, from the `first`-th range on"""
+        for start in range(first * chunk_size, total, chunk_size):
+            yield start, min(start + chunk_size, total)
+
+    @staticmethod
+    def chunk_position(count: int, chunk: int) -> Dict[str, Any]:
+        """Where chunk `chunk` of iter_expanded_chunks starts, for checkpoints"""
+        single_chunks = -(-count // PAIR_CHUNK_SIZE)
+        if chunk < single_chunks:
+            return {'chunk': chunk, 'keyword': chunk * PAIR_CHUNK_SIZE}
+        index = (chunk - single_chunks) * PAIR_CHUNK_SIZE
+        if index >= Sherluck.pair_count(count):
+            return {'chunk': chunk, 'pair': None}
+        return {'chunk': chunk, 'pair': list(Sherluck.pair_position(count, index))}
+
+    @staticmethod
+    def numeric_numbers(date_components: Set[str], date_patterns: Iterable[str] = ()) -> List[str]:
+        """
+        The first DATE_PATTERN_NUMBERS date concatenations, then the first
+        NUMERIC_NUMBERS of the date components and common numbers: capped
+        separately, so one date's many concatenations can't push out its
+        dd / mm or the common numbers.
+        """
+        patterns = list(dict.fromkeys(date_patterns))[:DATE_PATTERN_NUMBERS]
+        numbers = sorted(date_components)
         
         common_numbers = [str(i) for i in range(0, 20)]
         common_numbers.extend(['123', '1234', '12345', '111', '222', '333'])
         numbers.extend(common_numbers)
+        return patterns + [number for number in dict.fromkeys(numbers) if number not in patterns][:NUMERIC_NUMBERS]
+
+    @staticmethod
+    def numeric_expansions(word: str, numbers: List[str]) -> List[str]:
+        return [pattern for number in numbers
+                for pattern in (f"{word}{number}", f"{number}{word}",
+                                f"{word}_{number}", f"{number}_{word}")]
+
+    def generate_combinations(self, keywords: List[Tuple[str, float]], max_combinations: Optional[int] = 20000,
+                              seen=None, depth: int = 2,
+                              beam_width: int = 1000) -> Generator[Tuple[str, float], None, None]:
+        if not keywords:
+            return
+            
+        # First yield all individual words, then 2-word combinations, then
+        # beam-searched ones of up to `depth` words
+        if seen is None:
+            seen = SetDeduplicator()
+        count = 0
+        
+        for combo, weight in itertools.chain(keywords, self.iter_pair_combinations(keywords),
+                                             self.generate_beam_candidates(keywords, depth, beam_width)):
+            if seen.add(combo):
+                yield (combo, weight)
+                count += 1
+                if max_combinations is not None and count >= max_combinations:
+                    return
+
+    def add_numeric_patterns(self, words: Iterable[Tuple[str, float]], date_components: Set[str], max_patterns: Optional[int] = 10000,
+                             seen=None, date_patterns: Iterable[str] = ()) -> Generator[Tuple[str, float], None, None]:
+        numbers = self.numeric_numbers(date_components, date_patterns)
         
         count = 0
-        seen_patterns = set()
+        if seen is None:
+            seen = SetDeduplicator()
         
         for word, weight in words:
-            if word not in seen_patterns:
+            if seen.add(word):
                 yield (word, weight)
-                seen_patterns.add(word)
                 count += 1
             
-            if count >= max_patterns:
+            if max_patterns is not None and count >= max_patterns:
                 return
                 
-            for number in numbers[:8]:
-                patterns = [
-                    f"{word}{number}",
-                    f"{number}{word}",
-                    f"{word}_{number}",
-                    f"{number}_{word}"
-                ]
-                
-                for pattern in patterns:
-                    if pattern not in seen_patterns and count < max_patterns:
-                        yield (pattern, weight * 0.9)
-                        seen_patterns.add(pattern)
-                        count += 1
-                        if count >= max_patterns:
-                            return
+            pattern_weight = weight * 0.9
+            for pattern in self.numeric_expansions(word, numbers):
+                if seen.add(pattern):
+                    yield (pattern, pattern_weight)
+                    count += 1
+                    if max_patterns is not None and count >= max_patterns:
+                        return
+
+    def iter_expanded_chunks(self, keywords: List[Tuple[str, float]], numbers: List[str],
+                             workers: int = 1, first_chunk: int = 0,
+                             head: Optional[int] = None) -> Generator[Tuple[List[Tuple[str, float]], List[str], float], None, None]:
+        """
+        Yield (combinations, numeric expansions, numeric time share) chunks in
+        deterministic order.
+
+        Individual words come first, followed by the pair triangle split into
+        ranges of PAIR_CHUNK_SIZE pairs. With workers > 1 the pair ranges are
+        expanded in a process pool; results are still consumed in submission
+        order so the output is the same whatever the worker count. Chunks
+        before `first_chunk` are skipped without being expanded. With `head`,
+        only the first `head` words and the pairs involving them are expanded:
+        in row-major order those pairs are exactly the first rows.
+        """
+        count = len(keywords)
+        if head is None:
+            head = count
+        single_chunks = -(-head // PAIR_CHUNK_SIZE)
+        for start, stop in self.chunk_ranges(head, PAIR_CHUNK_SIZE, first_chunk):
+            yield expand_pair_range(keywords, numbers, start, stop, singles=True)
+        
+        total = self.pair_count(count) - self.pair_count(count - head)
+        ranges = self.chunk_ranges(total, PAIR_CHUNK_SIZE, max(first_chunk - single_chunks, 0))
+        if workers <= 1 or total <= PAIR_CHUNK_SIZE:
+            for start, stop in ranges:
+                yield expand_pair_range(keywords, numbers, start, stop)
+            return
+        
+        print(f"[+] Expanding {total} keyword pairs on {workers} workers")
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pair_worker,
+                                       initargs=(keywords, numbers))
+        pending = deque()
+        try:
+            for start, stop in ranges:
+                pending.append(executor.submit(_expand_pair_range_worker, start, stop))
+                if len(pending) >= workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def generate_candidates(self, keywords: List[Tuple[str, float]], numbers: List[str],
+                            workers: int = 1, stats: Optional[PipelineStats] = None,
+                            first_chunk: int = 0, on_chunk=None,
+                            head: Optional[int] = None, keep=None) -> Generator[Tuple[str, float], None, None]:
+        """
+        Combination and numeric stages as one raw stream; duplicates are left
+        for the output stage's deduplicator. Starts at chunk `first_chunk` of
+        iter_expanded_chunks and calls on_chunk(index) before each chunk, once
+        everything yielded from the previous ones has been consumed. `head`
+        restricts the stream as in iter_expanded_chunks. With `keep`, each
+        chunk's words are passed to keep(words), and those it marks False in
+        the list of bools it returns are dropped.
+        """
+        stride = 4 * len(numbers)
+        chunks = self.iter_expanded_chunks(keywords, numbers, workers, first_chunk, head)
+        
+        for chunk_index in itertools.count(first_chunk):
+            if on_chunk is not None:
+                on_chunk(chunk_index)
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            combos, expansions, numeric_share = chunk
+            if stats is not None:
+                # Time spent producing (or, with workers, waiting for) each chunk,
+                # split as the chunk's own expansion split it
+                elapsed = time.perf_counter() - start
+                stats.add('combinations', elapsed * (1 - numeric_share), produced=len(combos))
+                stats.add('numeric', elapsed * numeric_share, produced=len(expansions))
+            if keep is not None:
+                words = [word for word, _ in combos]
+                mask = keep(words + expansions)
+                kept = mask[len(words):]
+                for index, (word, weight) in enumerate(combos):
+                    if mask[index]:
+                        yield (word, weight)
+                    pattern_weight = weight * 0.9
+                    for pattern in itertools.compress(expansions[index * stride:(index + 1) * stride],
+                                                      kept[index * stride:(index + 1) * stride]):
+                        yield (pattern, pattern_weight)
+                continue
+            for index, (word, weight) in enumerate(combos):
+                yield (word, weight)
+                pattern_weight = weight * 0.9
+                for pattern in expansions[index * stride:(index + 1) * stride]:
+                    yield (pattern, pattern_weight)
+
+    @staticmethod
+    def iter_ranked_pairs(keywords: List[Tuple[str, float]]) -> Generator[Tuple[int, int, float], None, None]:
+        """
+        Yield (i, j, weight) for every i < j in descending pair weight.
+
+        keywords must already be sorted by descending weight. Each popped pair
+        (i, j) pushes (i, j + 1), and (i, i + 1) additionally pushes
+        (i + 1, i + 2), so every pair has exactly one parent of greater or
+        equal weight and the frontier never holds more than len(keywords)
+        entries.
+        """
+        count = len(keywords)
+        if count < 2:
+            return
+        heap = [(-(keywords[0][1] + keywords[1][1]) / 2, 0, 1)]
+        while heap:
+            neg_weight, i, j = heapq.heappop(heap)
+            yield i, j, -neg_weight
+            if j + 1 < count:
+                heapq.heappush(heap, (-(keywords[i][1] + keywords[j + 1][1]) / 2, i, j + 1))
+                if j == i + 1:
+                    heapq.heappush(heap, (-(keywords[i + 1][1] + keywords[j + 1][1]) / 2, i + 1, j + 1))
+
+    @staticmethod
+    def iter_beam_combinations(keywords: List[Tuple[str, float]], depth: int = 3, beam_width: int = 1000,
+                               sources: Optional[List[Any]] = None) -> Generator[Tuple[Tuple[int, ...], float], None, None]:
+        """
+        Yield (indices, weight) for combinations of 3..depth keywords, each
+        depth in descending weight (the mean of its keywords' weights).
+
+        keywords must already be sorted by descending weight. Rather than
+        enumerating all n^depth products, only the `beam_width` best partial
+        combinations of each length are extended by one more keyword. A
+        partial's extensions are in keyword order, so they come out of a heap
+        best-first, one successor pushed per pop, as in iter_ranked_pairs:
+        each step costs O(beam_width log beam_width) plus skipped keywords,
+        not beam_width * n. Among equal weights the partials take turns, so a
+        profile of equally weighted keywords still gets a beam spread over
+        all of them. `sources` gives each keyword's source (the base keyword
+        it is a variation of); a keyword whose source is already in the
+        combination is skipped, so variants of one base word don't stack up.
+        Without it, keywords equal ignoring case count as the same source.
+        """
+        count = len(keywords)
+        if sources is None:
+            sources = [word.lower() for word, _ in keywords]
+        # (weight sum, indices, sources used)
+        beam = [(weight, (i,), (sources[i],)) for i, (_, weight) in enumerate(keywords[:beam_width])]
+        for length in range(2, depth + 1):
+            # Ties go round-robin, each partial's j-th extension before any
+            # partial's (j+1)-th: equal weights would otherwise fill the beam
+            # with extensions of its first entry alone
+            heap = [(-(total + keywords[0][1]) / length, 0, index) for index, (total, _, _) in enumerate(beam)]
+            heapq.heapify(heap)
+            extended = []
+            while heap and len(extended) < beam_width:
+                neg_weight, j, index = heapq.heappop(heap)
+                total, indices, used = beam[index]
+                if j + 1 < count:
+                    heapq.heappush(heap, (-(total + keywords[j + 1][1]) / length, j + 1, index))
+                if sources[j] not in used:
+                    extended.append((total + keywords[j][1], indices + (j,), used + (sources[j],)))
+            beam = extended
+            if length >= 3:
+                for total, indices, _ in beam:
+                    yield indices, total / length
+
+    def generate_beam_candidates(self, keywords: List[Tuple[str, float]], depth: int = 3, beam_width: int = 1000,
+                                 involving: Optional[Set[str]] = None,
+                                 sources: Optional[Dict[str, int]] = None) -> Generator[Tuple[str, float], None, None]:
+        """
+        iter_beam_combinations joined with each separator (one per
+        combination); with `involving`, only combinations of at least one of
+        those keywords. `sources` maps each keyword to its base keyword, as
+        filled in by collect_variations.
+        """
+        if depth < 3 or not keywords:
+            return
+        ordered = sorted(keywords, key=lambda item: -item[1])
+        ids = None if sources is None else [sources[word] for word, _ in ordered]
+        for indices, weight in self.iter_beam_combinations(ordered, depth, beam_width, ids):
+            words = [ordered[index][0] for index in indices]
+            if involving is not None and involving.isdisjoint(words):
+                continue
+            for sep in COMBINATION_SEPARATORS:
+                yield (sep.join(words), weight)
+
+    def generate_ranked_candidates(self, keywords: List[Tuple[str, float]],
+                                   numbers: List[str]) -> Generator[Tuple[str, float], None, None]:
+        """
+        Combination and numeric stages in descending weight order.
+
+        Four individually sorted streams (words, pairs and the numeric patterns
+        of each) are merged lazily, so memory stays proportional to the number
+        of keywords. Duplicates are left for the output stage's deduplicator.
+        """
+        ordered = sorted(keywords, key=lambda item: -item[1])
+
+        def singles():
+            yield from ordered
+
+        def single_patterns():
+            for word, weight in ordered:
+                pattern_weight = weight * 0.9
+                for pattern in self.numeric_expansions(word, numbers):
+                    yield (pattern, pattern_weight)
+
+        def pairs(with_patterns: bool):
+            for i, j, weight in self.iter_ranked_pairs(ordered):
+                word1 = ordered[i][0]
+                word2 = ordered[j][0]
+                for sep in COMBINATION_SEPARATORS:
+                    for combo in (f"{word1}{sep}{word2}", f"{word2}{sep}{word1}"):
+                        if with_patterns:
+                            pattern_weight = weight * 0.9
+                            for pattern in self.numeric_expansions(combo, numbers):
+                                yield (pattern, pattern_weight)
+                        else:
+                            yield (combo, weight)
+
+        yield from heapq.merge(singles(), single_patterns(), pairs(False), pairs(True),
+                               key=lambda item: -item[1])
+
+    def generate_rules(self, numbers: List[str]) -> List[Tuple[List[str], float]]:
+        """
+        Cracker rules reproducing generate_word_variations and the numeric
+        stage, as (commands, weight) in descending weight order.
+
+        Commands use the syntax shared by John and hashcat; a command starting
+        with '/' is a John reject rule and is dropped for hashcat. Position
+        specific and multi-character leet replacements have no portable rule
+        equivalent and are left out.
+        """
+        forms = [([':'], 1.0), (['l'], 1.0), (['u'], 0.9), (['c'], 0.9)]
+        for char, replacement in self.simple_leet_subs.items():
+            substitution = ['l', f'/{char}', f's{char}{replacement}']
+            forms.append((substitution, 0.8))
+            forms.append((substitution + ['c'], 0.8))
+        
+        rules = list(forms)
+        # generate_word_variations keeps the first three suffixes of apply_prefixes_suffixes
+        for suffix in self.affix_suffixes[:3]:
+            append = [f'${char}' for char in suffix]
+            rules.extend((commands + append, 0.7) for commands, _ in forms)
+        
+        for number in numbers:
+            append = [f'${char}' for char in number]
+            prepend = [f'^{char}' for char in reversed(number)]
+            for commands, weight in forms:
+                commands = [command for command in commands if command != ':']
+                pattern_weight = weight * 0.9
+                rules.append((commands + append, pattern_weight))
+                rules.append((commands + prepend, pattern_weight))
+                rules.append((commands + ['$_'] + append, pattern_weight))
+                rules.append((commands + ['^_'] + prepend, pattern_weight))
+        
+        rules.sort(key=lambda rule: -rule[1])
+        return rules
+
+    @staticmethod
+    def render_rule(commands: List[str], rule_format: str) -> str:
+        rendered = []
+        for command in commands:
+            if rule_format == 'hashcat':
+                if command.startswith('/'):
+                    continue
+            else:
+                # John's rule preprocessor treats brackets and backslashes specially
+                command = command[0] + ''.join(f'\\{char}' if char in '[]\\' else char
+                                               for char in command[1:])
+            rendered.append(command)
+        return ' '.join(rendered) or ':'
+
+    def save_rules(self, rules: List[Tuple[List[str], float]], filename: str, rule_format: str = 'john'):
+        seen = set()
+        with open(filename, 'w', encoding='utf-8') as f:
+            if rule_format == 'john':
+                f.write('[List.Rules:Sherluck]\n')
+            for commands, _ in rules:
+                rule = self.render_rule(commands, rule_format)
+                if rule not in seen:
+                    seen.add(rule)
+                    f.write(rule + '\n')
+        
+        print(f"[+] {len(seen)} {rule_format} rules saved to {filename}")
+
+    def generate_rule_base_words(self, data: Dict[str, Any], max_words: int = 100000,
+                                 max_length: int = 30, weights: Dict[str, float] = None) -> Generator[str, None, None]:
+        """
+        Base words for --emit-rules: keywords, dates and 2-word combinations
+        in descending weight. Case, leet, affix and numeric variants are left
+        to the cracker's rule engine.
+        """
+        print("[+] Extracting keywords with weights...")
+        forms = {}
+        for word, weight in self.extract_keywords(data, weights):
+            for form in (word, word.capitalize()):
+                if form not in forms:
+                    forms[form] = weight
+        print(f"[+] Found {len(forms)} base forms")
+        
+        seen = SetDeduplicator()
+        count = 0
+        if max_words > 0:
+            for word, weight in self.generate_ranked_candidates(list(forms.items()), []):
+                if len(word) <= max_length and seen.add(word):
+                    yield word
+                    count += 1
+                    if count >= max_words:
+                        break
+        print(f"[+] Base wordlist contains {count} words")
+
+    def plan_wordlist(self, data: Dict[str, Any], max_words: int = 100000,
+                      min_length: int = 4, max_length: int = 30, weights: Dict[str, float] = None,
+                      include_common: bool = False, common_wordlists: List[str] = None,
+                      download: bool = False, calibrate: bool = True) -> Dict[str, Any]:
+        """
+        BudgetPlanner.plan() for a profile, plus the keyword, variation and
+        number counts and, with `calibrate`, a runtime estimate ('seconds')
+        from timing the first CALIBRATION_CANDIDATES raw candidates. Common
+        wordlists are weighted weights['common'] (0.5 by default); without
+        `download` their size is only known once cached and indexed.
+        """
+        if weights is None:
+            weights = {}
+        if common_wordlists is None:
+            common_wordlists = ['rockyou']
+        start = time.perf_counter()
+        date_values = self.date_values(data)
+        date_components = self.dates.components(date_values)
+        numbers = self.numeric_numbers(date_components, self.dates.patterns(date_values))
+        keywords = list(self.extract_keyword_groups(data, weights, date_components))
+        
+        # First group seen wins, as the first weight does in collect_variations
+        variations = {}
+        for group, word, weight in keywords:
+            for variation, var_weight in self.generate_word_variations(word, weight):
+                if variation not in variations:
+                    variations[variation] = (var_weight, group)
+        setup = time.perf_counter() - start
+        
+        common = (0, 0)
+        if include_common:
+            common = self.common_capacity(common_wordlists, max_words, min_length, max_length, download)
+        planner = BudgetPlanner([(word, weight, group) for word, (weight, group) in variations.items()],
+                                numbers, min_length, max_length)
+        plan = planner.plan(max_words, *(common or (0, 0)), weights.get('common', 0.5))
+        plan.update(keywords=len(keywords), variations=len(variations), numbers=len(numbers),
+                    common_known=common is not None, seconds=None)
+        
+        if calibrate and variations:
+            sample = [(word, weight) for word, (weight, _) in variations.items()]
+            candidates = self.generate_candidates(sample, numbers, workers=1)
+            start = time.perf_counter()
+            produced = 0
+            seen = set()
+            # Length filter and deduplication included, as in the output stage
+            for word, _ in itertools.islice(candidates, CALIBRATION_CANDIDATES):
+                produced += 1
+                if min_length <= len(word) <= max_length:
+                    seen.add(word)
+            elapsed = time.perf_counter() - start
+            candidates.close()
+            # Raw candidates needed, from each stage's share of in-range words
+            needed = sum(stage['allocated'] * stage['raw'] / stage['in_range']
+                         for name, stage in plan['stages'].items() if name != 'common' and stage['in_range'])
+            plan['seconds'] = setup + needed * elapsed / max(produced, 1)
+        return plan
 
     def generate_wordlist(self, data: Dict[str, Any], max_words: int = 100000,
                          min_length: int = 4, max_length: int = 30, 
                          use_threading: bool = True, weights: Dict[str, float] = None,
-                         include_common: bool = False, common_wordlists: List[str] = None) -> Generator[str, None, None]:
-        
+                         include_common: bool = False, common_wordlists: List[str] = None,
+                         workers: Optional[int] = None, ranked: bool = False,
+                         dedup: str = 'set', dedup_fpr: float = 0.001,
+                         stats: Optional[PipelineStats] = None,
+                         checkpoint: Optional[GenerationCheckpoint] = None,
+                         previous: Optional[Dict[str, Any]] = None,
+                         exclude: Iterable[str] = (), backend: str = 'python',
+                         encoded: bool = False, budget: bool = False, depth: int = 2,
+                         beam_width: int = 1000, shard: Optional[Tuple[int, int]] = None,
+                         exclusion: Optional[ExclusionIndex] = None) -> Generator[Union[str, bytes], None, None]:
+        """
+        Lazily chain extract -> variation -> combination -> numeric stages.
+
+        Only the keyword variations are materialised; combinations and numeric
+        patterns are produced on demand, so the first word is available right
+        away and nothing beyond max_words is ever generated. The pairwise
+        expansion runs on `workers` processes (one by default) unless
+        use_threading is False. With ranked set, candidates are emitted in
+        descending weight instead, so truncation keeps the likeliest ones.
+        Every emitted word, common wordlists included, goes through a single
+        deduplicator chosen by `dedup` (see DEDUP_BACKENDS). Per-stage timings
+        and produced / deduplicated / filtered / truncated counts are added to
+        `stats` when given. With a `checkpoint`, the position is marked at
+        every chunk boundary, and a loaded one resumes after the words it
+        records (unranked only). Given the `previous` run's manifest (see
+        build_manifest), only candidates involving variations that are new or
+        reweighted since then are generated; words in `exclude` (the previous
+        output) are never emitted. With backend 'numpy' the combination and
+        numeric stages run in a NumpyProductEngine, which deduplicates on its
+        own 64-bit fingerprints whatever `dedup` says and ignores `workers`;
+        with `encoded` also set, each of its chunks is yielded as one bytes
+        buffer of newline-terminated words (which save_wordlist accepts)
+        instead of word by word. With `budget`, variations are ordered by
+        descending weight and max_words is split between the single-word,
+        pair and common stages by BudgetPlanner, so a flood of low-weight
+        pairs can't crowd out the common wordlists (unranked, non-delta only).
+        With `depth` above 2, a beam search (see iter_beam_combinations) adds
+        combinations of 3..depth words after the pairs, which leave room for
+        up to a fifth of max_words of them. With `shard` = (index, count),
+        only the candidates of that CandidateShard are built and deduplicated.
+        The shards are disjoint, and every limit (max_words, the budget, the
+        beam and common shares) applies to the shard's own output: until a
+        limit cuts them short, the shards together are exactly the unsharded
+        output.
+        Words recorded in the `exclusion` index are never emitted, and those
+        that are emitted are recorded in it for its save(); the python
+        backend then deduplicates on FingerprintDeduplicator fingerprints
+        too, so dedup must be exact.
+        """
+        if stats is None:
+            stats = PipelineStats()
         if common_wordlists is None:
             common_wordlists = ['rockyou']
+        if backend not in ('python', 'numpy'):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == 'numpy' and ranked:
+            raise ValueError("The numpy backend does not support ranked output")
+        if exclusion is not None and backend == 'python' and dedup == 'bloom':
+            raise ValueError("An exclusion index needs exact deduplication, not bloom")
+        if budget and (ranked or previous is not None):
+            raise ValueError("Budgeted generation is not supported with ranked or delta output")
+        sharding = None
+        if shard is not None:
+            sharding = CandidateShard(*shard)
+            if checkpoint is not None or previous is not None:
+                raise ValueError("Sharded generation cannot be checkpointed or used for delta output")
+        if not use_threading:
+            workers = 1
+        elif workers is None:
+            # The parent still filters and deduplicates every word, so a pool
+            # only pays off for large runs on idle cores; it is opt-in
+            workers = 1
         
         print("[+] Extracting keywords with weights...")
-        keywords_with_weights = list(self.extract_keywords(data, weights))
+        with stats.timer('keywords') as stage:
+            # Dates are parsed once and shared by the keyword and numeric stages
+            date_values = self.date_values(data)
+            date_components = self.dates.components(date_values)
+            numbers = self.numeric_numbers(date_components, self.dates.patterns(date_values))
+            keyword_groups = list(self.extract_keyword_groups(data, weights, date_components))
+            keywords_with_weights = [(word, weight) for _, word, weight in keyword_groups]
+            stage['produced'] += len(keywords_with_weights)
         print(f"[+] Found {len(keywords_with_weights)} base keywords")
         
         print("[+] Generating word variations...")
-        all_variations = []
-        variation_count = 0
-        for word, weight in keywords_with_weights:
-            for variation, var_weight in self.generate_word_variations(word, weight):
-                if variation_count < 50000:
-                    all_variations.append((variation, var_weight))
-                    variation_count += 1
-        print(f"[+] Generated {variation_count} variations")
-        
-        print("[+] Generating combinations...")
-        combinations = []
-        combo_count = 0
-        for combo, weight in self.generate_combinations(all_variations, 30000):
-            if combo_count < 30000:
-                combinations.append((combo, weight))
-                combo_count += 1
-        print(f"[+] Generated {combo_count} combinations")
-        
-        print("[+] Adding numeric patterns...")
-        date_components = self.extract_dates_from_data(data)
+        with stats.timer('variations'):
+            sources = {}
+            variations = self.collect_variations(keywords_with_weights, stats, sources)
+        print(f"[+] Generated {len(variations)} unique variations")
+        
+        # Without a budget every stage may take up to max_words, common lists a fifth of it
+        word_limit = pair_limit = max_words
+        common_limit = max_words // 5
+        if budget:
+            with stats.timer('budget'):
+                variations.sort(key=lambda item: -item[1])
+                common = (0, 0)
+                if include_common:
+                    common = self.common_capacity(common_wordlists, max_words, min_length, max_length)
+                planner = BudgetPlanner([(word, weight, keyword_groups[sources[word]][0]) for word, weight in variations],
+                                        numbers, min_length, max_length)
+                plan = planner.plan(max_words, *common, weights.get('common', 0.5) if weights else 0.5)
+            allocated = {name: stage['allocated'] for name, stage in plan['stages'].items()}
+            word_limit = allocated['words']
+            pair_limit = max_words - allocated['common']
+            common_limit = max_words
+            stats.extra['budget'] = allocated
+            stats.extra['budget_groups'] = {group: info['allocated'] for group, info in plan['groups'].items()}
+            print(f"[+] Budget: {allocated['words']} single words, {allocated['pairs']} pairs, "
+                  f"{allocated['common']} common words")
+        
+        head = None
+        if previous is not None:
+            if ranked:
+                raise ValueError("Delta generation is not supported with ranked output")
+            variations, head = self.split_new_variations(variations, numbers, previous,
+                                                         self.manifest_options(min_length, max_length))
+            print(f"[+] {head} of {len(variations)} variations are new or changed since the previous run")
+        
+        deep = []
+        if depth > 2:
+            with stats.timer('beam') as stage:
+                # A delta run only wants combinations involving a new or reweighted variation
+                involving = None if head is None else {word for word, _ in variations[:head]}
+                for word, weight in self.generate_beam_candidates(variations, depth, beam_width, involving, sources):
+                    stage['produced'] += 1
+                    if min_length <= len(word) <= max_length:
+                        deep.append(word)
+                    else:
+                        stage['filtered'] += 1
+                if sharding is not None and deep:
+                    deep = list(itertools.compress(deep, sharding.keep(deep)))
+            # Like the common lists, at most a fifth of the output
+            reserved = min(len(deep), max_words // 5)
+            word_limit = min(word_limit, max_words - reserved)
+            pair_limit = max(pair_limit - reserved, 0)
+            print(f"[+] Beam search kept {len(deep)} combinations of 3 to {depth} words")
+        
+        capacity = max_words + (previous or {}).get('words', 0)
+        if backend == 'numpy' or exclusion is not None:
+            # An exclusion index holds these fingerprints, so seeding the
+            # deduplicator with it makes its lookups free per candidate
+            capacity += len(exclusion) if exclusion is not None else 0
+            seen = FingerprintDeduplicator(capacity)
+        else:
+            seen = make_deduplicator(dedup, capacity, dedup_fpr)
+        add = seen.add
+        if exclusion is not None:
+            with stats.timer('exclusion') as stage:
+                exclusion.seed(seen)
+                stage['produced'] += len(exclusion)
+            fingerprint = seen.fingerprint
+            add_fingerprint = seen.add_fingerprint
+            record = exclusion.record
+            
+            def add(word: str) -> bool:
+                """seen.add(), recording the words it lets through as emitted"""
+                value = fingerprint(word)
+                if add_fingerprint(value):
+                    record(value)
+                    return True
+                return False
         final_count = 0
+        filtered = duplicates = 0
+        position = {'stage': 'combinations', 'chunk': 0}
+        
+        if exclude:
+            with stats.timer('exclude') as stage:
+                for word in exclude:
+                    seen.add(word)
+                    stage['produced'] += 1
         
-        for word, weight in self.add_numeric_patterns(combinations, date_components, max_words):
-            if min_length <= len(word) <= max_length and final_count < max_words:
-                yield word
-                final_count += 1
-        
-        if include_common and final_count < max_words:
-            print("[+] Adding common wordlists...")
-            common_count = 0
-            for common_word in self.load_external_wordlists(common_wordlists, max_words // 5):
-                if final_count < max_words:
-                    yield common_word
-                    final_count += 1
-                    common_count += 1
+        if checkpoint is not None and checkpoint.resume:
+            if ranked:
+                raise ValueError("Ranked runs cannot be resumed")
+            rebuilt = 'fingerprint' if isinstance(seen, FingerprintDeduplicator) else dedup
+            print(f"[+] Resuming after {checkpoint.words} words, rebuilding the {rebuilt} deduplicator...")
+            with stats.timer('resume') as stage:
+                for word in checkpoint.written_words():
+                    add(word)
+                    stage['produced'] += 1
+            final_count = checkpoint.words
+            position = checkpoint.resume['position']
+        
+        single_chunks = -(-(len(variations) if head is None else head) // PAIR_CHUNK_SIZE)
+        current = {'chunk': position['chunk']}
+        
+        def on_chunk(chunk: int):
+            current['chunk'] = chunk
+            if checkpoint is not None:
+                checkpoint.mark(final_count, {'stage': 'combinations',
+                                              **self.chunk_position(len(variations), chunk)})
+        
+        def limit() -> int:
+            """Words the current chunk may still emit"""
+            return (word_limit if current['chunk'] < single_chunks else pair_limit) - final_count
+        
+        candidates = None
+        common_count = produced = 0
+        
+        def record_output():
+            # No timer here: the consumer runs between yields, so its time would be counted too
+            stats.add('output', produced=final_count + filtered + duplicates, filtered=filtered,
+                      deduplicated=duplicates, truncated=int(final_count >= max_words))
+        
+        def record_deep():
+            stats.add('deep', produced=produced, deduplicated=duplicates, truncated=int(produced < len(deep)))
+        
+        def record_common():
+            stats.add('common', produced=produced, deduplicated=duplicates,
+                      truncated=int(final_count >= max_words or produced >= common_limit))
             print(f"[+] Added {common_count} common words")
         
-        print(f"[+] Final wordlist contains {final_count} words")
+        # A consumer that has all the words it wants closes this generator at a
+        # yield, so the stage in progress and the totals are recorded on the way out
+        pending = record_output
+        try:
+            if backend == 'numpy' and position['stage'] == 'combinations' and max_words > final_count:
+                print("[+] Streaming combinations and numeric patterns (numpy)...")
+                engine = NumpyProductEngine(variations, numbers, min_length, max_length, seen, head, sharding,
+                                            exclusion)
+                for chunk_index in itertools.count(position['chunk']):
+                    on_chunk(chunk_index)
+                    if limit() <= 0:
+                        if chunk_index < single_chunks:
+                            continue
+                        break
+                    start = time.perf_counter()
+                    chunk = engine.chunk(chunk_index, limit())
+                    if chunk is None:
+                        break
+                    text, count, chunk_filtered, chunk_duplicates, combos = chunk
+                    stats.add('combinations', time.perf_counter() - start, produced=combos)
+                    # One vectorised pass builds both; there is no numeric time of its own
+                    stats.add('numeric', produced=combos * (len(engine.prefixes) - 1))
+                    stats.timed_with('numeric', 'combinations')
+                    filtered += chunk_filtered
+                    duplicates += chunk_duplicates
+                    final_count += count
+                    if text:
+                        if encoded:
+                            yield text.encode('utf-8', 'surrogateescape')
+                        else:
+                            yield from text.split('\n')[:-1]
+                    if final_count >= pair_limit:
+                        break
+            elif ranked:
+                print("[+] Streaming combinations and numeric patterns by weight...")
+                candidates = self.generate_ranked_candidates(variations, numbers)
+            elif position['stage'] == 'combinations':
+                print("[+] Streaming combinations and numeric patterns...")
+                candidates = self.generate_candidates(variations, numbers, workers, stats, position['chunk'],
+                                                      on_chunk, head, sharding.keep if sharding is not None else None)
+            
+            if candidates is not None and pair_limit > final_count:
+                for word, weight in candidates:
+                    if not ranked and limit() <= 0:
+                        if current['chunk'] < single_chunks:
+                            # Single-word budget spent: skip ahead to the pairs
+                            continue
+                        break
+                    if not min_length <= len(word) <= max_length:
+                        filtered += 1
+                    elif not add(word):
+                        duplicates += 1
+                    else:
+                        final_count += 1
+                        yield word
+                        if final_count >= pair_limit:
+                            break
+            if candidates is not None:
+                candidates.close()
+            pending = None
+            record_output()
+            
+            if deep and position['stage'] in ('combinations', 'deep') and final_count < max_words:
+                produced = position.get('produced', 0) if position['stage'] == 'deep' else 0
+                duplicates = 0
+                pending = record_deep
+                for word in itertools.islice(deep, produced, None):
+                    if final_count >= max_words:
+                        break
+                    if checkpoint is not None and produced % WRITE_BATCH_WORDS == 0:
+                        checkpoint.mark(final_count, {'stage': 'deep', 'produced': produced})
+                    produced += 1
+                    if add(word):
+                        final_count += 1
+                        yield word
+                    else:
+                        duplicates += 1
+                pending = None
+                record_deep()
+            
+            if include_common and final_count < max_words:
+                print("[+] Adding common wordlists...")
+                common_count = 0
+                produced = position.get('produced', 0) if position['stage'] == 'common' else 0
+                duplicates = 0
+                common_words = self.load_external_wordlists(common_wordlists, common_limit, min_length, max_length)
+                if sharding is not None:
+                    common_words = sharding.filter(common_words)
+                common_words = itertools.islice(common_words, produced, None)
+                pending = record_common
+                for common_word in common_words:
+                    if final_count >= max_words:
+                        break
+                    if checkpoint is not None and produced % WRITE_BATCH_WORDS == 0:
+                        checkpoint.mark(final_count, {'stage': 'common', 'produced': produced})
+                    produced += 1
+                    if add(common_word):
+                        final_count += 1
+                        common_count += 1
+                        yield common_word
+                    else:
+                        duplicates += 1
+                pending = None
+                record_common()
+        finally:
+            if candidates is not None:
+                candidates.close()
+            if pending is not None:
+                pending()
+            stats.extra['emitted'] = final_count
+            stats.extra['max_words'] = max_words
+            if sharding is None:
+                print(f"[+] Final wordlist contains {final_count} words")
+            else:
+                stats.extra['shard'] = {'index': sharding.index, 'count': sharding.count}
+                print(f"[+] Final wordlist contains {final_count} words of shard {sharding.index + 1}/{sharding.count}")
+
+    def build_manifest(self, data: Dict[str, Any], weights: Dict[str, float], options: Dict[str, Any],
+                       files: List[str], words: int) -> Dict[str, Any]:
+        """Record what a run was generated from, for a later --delta run to diff against"""
+        return {
+            'version': 1,
+            'keywords': [[word, weight] for word, weight in self.extract_keywords(data, weights)],
+            'numbers': self.date_numbers(data),
+            'options': options,
+            'files': files,
+            'words': words,
+            'created': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def manifest_options(self, min_length: int, max_length: int) -> Dict[str, Any]:
+        """Settings that change which words a keyword expands into"""
+        return {'min_length': min_length, 'max_length': max_length,
+                'leet_depth': self.leet.depth, 'leet_budget': self.leet.budget}
+
+    def save_manifest(self, manifest: Dict[str, Any], filename: str):
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, filename)
+        print(f"[+] Keyword manifest written to {filename}")
+
+    def split_new_variations(self, variations: List[Tuple[str, float]], numbers: List[str],
+                             previous: Dict[str, Any], options: Dict[str, Any]) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Reorder variations so those that are new or reweighted since the
+        `previous` manifest come first; returns (variations, how many are new).
+
+        Everything counts as new when the numeric suffixes, length limits or
+        leet settings changed, since then every existing word's expansions
+        differ too.
+        """
+        if previous.get('numbers') != numbers or previous.get('options') != options:
+            print("[!] Dates, length limits or leet settings changed since the previous run; every variation counts as new")
+            return variations, len(variations)
+        
+        known = dict(self.collect_variations((word, weight) for word, weight in previous['keywords']))
+        fresh = [(word, weight) for word, weight in variations if known.get(word) != weight]
+        kept = [(word, weight) for word, weight in variations if known.get(word) == weight]
+        return fresh + kept, len(fresh)
 
-    def save_wordlist(self, wordlist_generator: Generator[str, None, None], filename: str, max_words: int):
-        count = 0
-        with open(filename, 'w', encoding='utf-8') as f:
-            for word in wordlist_generator:
-                if count >= max_words:
-                    break
-                f.write(word + '\n')
-                count += 1
-                if count % 10000 == 0:
-                    print(f"[+] Written {count} words so far...")
+    def save_wordlist(self, wordlist_generator: Iterable[Union[str, bytes]], filename: str, max_words: int,
+                      compression: Optional[str] = None, split_every: Optional[int] = None,
+                      checkpoint: Optional[GenerationCheckpoint] = None):
+        """
+        Write up to max_words words through a WordlistWriter; returns the number
+        written. Besides words, the generator may yield bytes buffers of
+        encoded, newline-terminated words (generate_wordlist with `encoded`),
+        which are written as they are. The generator is closed once writing
+        stops. A checkpoint (the one given to generate_wordlist) is kept up to
+        date while writing, continued from if it was loaded, and removed once
+        the run completes.
+        """
+        count = checkpoint.words if checkpoint is not None else 0
+        progress = ProgressLine("Written")
+        append_offset = checkpoint.offset if checkpoint is not None else None
+        with WordlistWriter(filename, compression, split_every, append_offset=append_offset) as writer:
+            def write(batch: Union[List[str], bytes], size: int):
+                offset = writer.bytes_written
+                if isinstance(batch, bytes):
+                    writer.write_encoded(batch)
+                else:
+                    writer.write(batch)
+                if checkpoint is not None:
+                    checkpoint.written(batch, count, offset, writer)
+                progress.update(count + size)
+            
+            try:
+                batch = []
+                items = wordlist_generator if count < max_words else ()
+                for item in items:
+                    if isinstance(item, bytes):
+                        if batch:
+                            write(batch, len(batch))
+                            count += len(batch)
+                            batch = []
+                        size = item.count(b'\n')
+                        if count + size > max_words:
+                            size = max_words - count
+                            item = head_lines(item, size)
+                        write(item, size)
+                        count += size
+                    else:
+                        batch.append(item)
+                        if len(batch) >= WRITE_BATCH_WORDS:
+                            write(batch, len(batch))
+                            count += len(batch)
+                            batch = []
+                    if count + len(batch) >= max_words:
+                        break
+                if batch:
+                    write(batch, len(batch))
+                    count += len(batch)
+            except BaseException:
+                if checkpoint is not None:
+                    writer.flush()
+                    if checkpoint.save():
+                        print(f"[!] Stopped early; continue with --resume (checkpoint: {checkpoint.path})")
+                raise
+            finally:
+                # Once max_words are written nothing more is pulled: let the
+                # generator finish its bookkeeping
+                if hasattr(wordlist_generator, 'close'):
+                    wordlist_generator.close()
+        progress.finish()
+        if checkpoint is not None:
+            checkpoint.remove()
+        
+        destination = 'stdout' if filename == '-' else filename
+        if len(writer.files) > 1:
+            destination = f"{len(writer.files)} shards ({writer.files[0]} ... {writer.files[-1]})"
+        print(f"[+] Wordlist saved to {destination} with {count} words ({writer.bytes_written} bytes uncompressed)")
+        return count
+
+def expand_pair_range(keywords: List[Tuple[str, float]], numbers: List[str], start: int, stop: int,
+                      singles: bool = False) -> Tuple[List[Tuple[str, float]], List[str], float]:
+    """
+    Expand one unit of work: the combinations for pairs start..stop (or the
+    individual words start..stop when singles is set), flattened in the
+    same order the numeric patterns of every combination, and the share of
+    the time spent on the numeric patterns.
+    """
+    start_time = time.perf_counter()
+    if singles:
+        combos = keywords[start:stop]
+    else:
+        combos = list(Sherluck.iter_pair_combinations(keywords, start, stop))
+    numeric_time = time.perf_counter()
+    expansions = []
+    for combo, _ in combos:
+        expansions.extend(Sherluck.numeric_expansions(combo, numbers))
+    end_time = time.perf_counter()
+    numeric_share = (end_time - numeric_time) / (end_time - start_time) if end_time > start_time else 0.0
+    return combos, expansions, numeric_share
+
+_pair_worker_state = {}
+
+def _init_pair_worker(keywords: List[Tuple[str, float]], numbers: List[str]) -> None:
+    _pair_worker_state['keywords'] = keywords
+    _pair_worker_state['numbers'] = numbers
+
+def _expand_pair_range_worker(start: int, stop: int) -> Tuple[List[Tuple[str, float]], List[str], float]:
+    return expand_pair_range(_pair_worker_state['keywords'], _pair_worker_state['numbers'], start, stop)
+
+class NumpyProductEngine:
+    """
+    Vectorised combination and numeric stages for --backend numpy.
+
+    Works through the same chunks as iter_expanded_chunks and produces the
+    same words in the same order. Every keyword and separator is reduced once
+    to its byte length, character length and polynomial hash (see
+    FingerprintDeduplicator), and every numeric form (word, word+n, n+word,
+    word_n, n_word) to a multiplier and offset. The lengths and fingerprints
+    of all products in a chunk then follow from a few array operations: the
+    length limits become a mask and deduplication a single add_fingerprints()
+    call. Text is only built for the survivors, one str.join per combination
+    over a cached template of its kept forms, and the chunk is returned as a
+    single newline-terminated string.
+    """
+
+    def __init__(self, keywords: List[Tuple[str, float]], numbers: List[str], min_length: int,
+                 max_length: int, seen: FingerprintDeduplicator, head: Optional[int] = None,
+                 shard: Optional[CandidateShard] = None, exclusion: Optional[ExclusionIndex] = None):
+        np = self.np = _import_numpy()
+        self.keywords = keywords
+        self.words = [word for word, _ in keywords]
+        self.min_length = min_length
+        self.max_length = max_length
+        self.seen = seen
+        self.shard = shard
+        self.exclusion = exclusion
+        self.head = len(keywords) if head is None else head
+        self.single_chunks = -(-self.head // PAIR_CHUNK_SIZE)
+        self.total_pairs = Sherluck.pair_count(len(keywords)) - Sherluck.pair_count(len(keywords) - self.head)
+
+        self.hashes, self.powers, self.lengths = self._tokens(self.words)
+        self.sep_hashes, self.sep_powers, self.sep_lengths = self._tokens(COMBINATION_SEPARATORS)
+        count = len(keywords)
+        rows = np.arange(count, dtype=np.int64)
+        self.row_starts = rows * (2 * count - rows - 1) // 2
+
+        # Form r of a combination c is prefix[r] + c + suffix[r]
+        prefixes, suffixes = [''], ['']
+        for number in numbers:
+            prefixes.extend(('', number, '', f"{number}_"))
+            suffixes.extend((number, '', f"_{number}", ''))
+        prefix_hashes, _, prefix_lengths = self._tokens(prefixes)
+        suffix_hashes, suffix_powers, suffix_lengths = self._tokens(suffixes)
+        self.prefixes = prefixes
+        self.suffixes = suffixes
+        # H(p + c + s) = (H(p) * P(c) + H(c)) * P(s) + H(s)
+        self.form_prefix = prefix_hashes
+        self.form_multiplier = suffix_powers
+        self.form_offset = suffix_hashes
+        self.form_lengths = prefix_lengths + suffix_lengths
+        self._templates = {}
+
+    def _tokens(self, tokens: List[str]):
+        """(hashes, powers, character lengths) arrays for a list of strings"""
+        np = self.np
+        polynomials = [FingerprintDeduplicator.polynomial(token.encode('utf-8', 'surrogateescape')) for token in tokens]
+        hashes = np.array([value for value, _ in polynomials], dtype=np.uint64)
+        powers = np.array([power for _, power in polynomials], dtype=np.uint64)
+        return hashes, powers, np.array([len(token) for token in tokens], dtype=np.int64)
+
+    def chunk(self, index: int, limit: int) -> Optional[Tuple[str, int, int, int, int]]:
+        """
+        Expand chunk `index`, emitting at most `limit` words. Returns (text,
+        words, filtered, duplicates, combinations), or None past the last chunk.
+        With a `shard`, words outside it are dropped before anything else and
+        not counted at all. The fingerprints of the emitted words are recorded
+        in the `exclusion` index, if any.
+        """
+        np = self.np
+        if index < self.single_chunks:
+            start = index * PAIR_CHUNK_SIZE
+            stop = min(start + PAIR_CHUNK_SIZE, self.head)
+            combos = self.words[start:stop]
+            hashes = self.hashes[start:stop]
+            powers = self.powers[start:stop]
+            lengths = self.lengths[start:stop]
+        else:
+            start = (index - self.single_chunks) * PAIR_CHUNK_SIZE
+            if start >= self.total_pairs:
+                return None
+            stop = min(start + PAIR_CHUNK_SIZE, self.total_pairs)
+            combos = [combo for combo, _ in Sherluck.iter_pair_combinations(self.keywords, start, stop)]
+            pairs = np.arange(start, stop, dtype=np.int64)
+            i = np.searchsorted(self.row_starts, pairs, side='right') - 1
+            j = i + 1 + pairs - self.row_starts[i]
+            # Order of iter_pair_combinations: pair, separator, direction
+            shape = (len(pairs), len(COMBINATION_SEPARATORS), 2)
+            first = np.empty(shape, dtype=np.int64)
+            second = np.empty(shape, dtype=np.int64)
+            first[:, :, 0] = second[:, :, 1] = i[:, None]
+            first[:, :, 1] = second[:, :, 0] = j[:, None]
+            first, second = first.ravel(), second.ravel()
+            seps = np.broadcast_to(np.arange(shape[1])[None, :, None], shape).ravel()
+            hashes = ((self.hashes[first] * self.sep_powers[seps] + self.sep_hashes[seps])
+                      * self.powers[second] + self.hashes[second])
+            powers = self.powers[first] * self.sep_powers[seps] * self.powers[second]
+            lengths = self.lengths[first] + self.sep_lengths[seps] + self.lengths[second]
+
+        # One row per combination, one column per form, in output order
+        word_lengths = lengths[:, None] + self.form_lengths[None, :]
+        keep = (word_lengths >= self.min_length) & (word_lengths <= self.max_length)
+        fingerprints = FingerprintDeduplicator.mix_array(
+            (self.form_prefix[None, :] * powers[:, None] + hashes[:, None]) * self.form_multiplier[None, :]
+            + self.form_offset[None, :])
+        fingerprints = fingerprints.ravel()
+        in_range = keep.ravel()
+        ours = None
+        if self.shard is not None:
+            ours = self.shard.mask(fingerprints)
+            in_range = in_range & ours
+        flat = in_range.copy()
+        flat[in_range] = self.seen.add_fingerprints(fingerprints[in_range], max(limit, 0))
+        if self.exclusion is not None:
+            self.exclusion.record_fingerprints(fingerprints[flat])
+
+        considered = len(flat)
+        emitted = np.flatnonzero(flat)
+        if len(emitted) >= limit:
+            # Output stops at the limit-th word; what follows it was never considered
+            considered = int(emitted[limit - 1]) + 1 if limit > 0 else 0
+        offered = considered if ours is None else int(ours[:considered].sum())
+        filtered = offered - int(in_range[:considered].sum())
+        duplicates = int(in_range[:considered].sum()) - int(flat[:considered].sum())
+        words = int(flat.sum())
+
+        keys = np.packbits(flat.reshape(keep.shape), axis=1)
+        width = keys.shape[1]
+        keys = keys.tobytes()
+        pieces = []
+        for position, combo in enumerate(combos):
+            key = keys[position * width:(position + 1) * width]
+            template = self._templates.get(key)
+            if template is None:
+                template = self._template(key)
+            if template:
+                pieces.append(combo.join(template))
+        return ''.join(pieces), words, filtered, duplicates, len(combos)
+
+    def _template(self, key: bytes) -> List[str]:
+        """Separators that turn combination c into its kept forms via c.join()"""
+        forms = [index for index in range(len(self.prefixes))
+                 if key[index >> 3] & (0x80 >> (index & 7))]
+        template = []
+        if forms:
+            template.append(self.prefixes[forms[0]])
+            for previous, form in zip(forms, forms[1:]):
+                template.append(f"{self.suffixes[previous]}\n{self.prefixes[form]}")
+            template.append(f"{self.suffixes[forms[-1]]}\n")
+        if len(self._templates) >= 4096:
+            self._templates.clear()
+        self._templates[key] = template
+        return template
+
+def emit_rules(generator: Sherluck, data: Dict[str, Any], weights: Dict[str, float], args: argparse.Namespace):
+    rules_output = args.rules_output or args.output + ('.rule' if args.rules_format == 'hashcat' else '.conf')
+    
+    base_words = generator.generate_rule_base_words(data, args.max_words, args.max_length, weights)
+    generator.save_wordlist(base_words, args.output, args.max_words)
+    
+    numbers = generator.date_numbers(data)
+    generator.save_rules(generator.generate_rules(numbers), rules_output, args.rules_format)
+    
+    if args.rules_format == 'hashcat':
+        print(f"[+] Run: hashcat -a 0 <hashes> {args.output} -r {rules_output}")
+    else:
+        print(f"[+] Add '.include \"{os.path.abspath(rules_output)}\"' to john-local.conf, then run:")
+        print(f"[+] john --wordlist={args.output} --rules=Sherluck <hashes>")
+
+def iter_batch_profiles(source: str) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    """
+    Profiles for --batch: every *.json in a directory (named after the file)
+    or one JSON object per line of a JSONL file or stdin ('-'), named after
+    its "profile_id" field or line number.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.json'):
+                path = os.path.join(source, name)
+                try:
+                    with open(path, 'r') as f:
+                        yield name[:-len('.json')], json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"[!] Skipping {path}: {e}")
+        return
+    
+    stream = sys.stdin if source == '-' else open(source, 'r')
+    try:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[!] Skipping line {line_number} of {source}: {e}")
+                continue
+            if not isinstance(data, dict):
+                print(f"[!] Skipping line {line_number} of {source}: not a JSON object")
+                continue
+            yield str(data.get('profile_id') or f"profile_{line_number}"), data
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+_batch_worker_state = {}
+
+def _init_batch_worker(config: Dict[str, Any], options: Dict[str, Any]) -> None:
+    generator = Sherluck()
+    generator.cache_dir = config['cache_dir']
+    generator.wordlist_checksums = config['wordlist_checksums']
+    generator.leet = LeetEngine(config['leet_depth'], config['leet_budget'])
+    _batch_worker_state['generator'] = generator
+    _batch_worker_state['options'] = options
+
+_hash_worker_state = {}
+
+def _init_hash_worker(format_type: str, targets: Set[bytes]) -> None:
+    _hash_worker_state['digest'] = HashVerifier.FORMATS[format_type][0]
+    _hash_worker_state['targets'] = targets
+
+def _verify_hash_batch(items: List[Union[str, bytes]]) -> Tuple[int, List[Tuple[bytes, str]]]:
+    """Digest a batch of words and encoded buffers; returns (words checked, [(digest, word)] hits)"""
+    digest = _hash_worker_state['digest']
+    targets = _hash_worker_state['targets']
+    checked = 0
+    hits = []
+    for item in items:
+        if isinstance(item, bytes):
+            lines = item.split(b'\n')[:-1]
+        else:
+            lines = (item.encode('utf-8', 'surrogateescape'),)
+        for data in lines:
+            checked += 1
+            value = digest(data)
+            if value in targets:
+                hits.append((value, data.decode('utf-8', 'surrogateescape')))
+    return checked, hits
+
+def _run_batch_profile(profile_id: str, data: Dict[str, Any], path: str, keyed: bool) -> int:
+    """Generate one profile's wordlist into path; returns the number of words written"""
+    generator = _batch_worker_state['generator']
+    options = _batch_worker_state['options']
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        words = generator.generate_wordlist(data, weights=data.get('weights', {}), use_threading=False, **options)
+        if keyed:
+            words = (f"{profile_id}\t{word}" for word in words)
+        return generator.save_wordlist(words, path, options['max_words'])
+
+def generation_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """The generate_wordlist options shared by --batch profiles and --serve requests"""
+    return {
+        'max_words': args.max_words,
+        'min_length': args.min_length,
+        'max_length': args.max_length,
+        'include_common': args.include_common,
+        'common_wordlists': args.common_lists,
+        'ranked': args.ranked,
+        'dedup': args.dedup,
+        'dedup_fpr': args.dedup_fpr,
+        'backend': args.backend,
+        'budget': args.budget,
+        'depth': args.depth,
+        'beam_width': args.beam_width,
+        'shard': parse_shard(args.shard),
+    }
+
+def run_batch(generator: Sherluck, args: argparse.Namespace):
+    """
+    --batch: generate a wordlist per profile on a pool of worker processes.
+
+    Each worker builds its Sherluck tables once and keeps the memory-mapped
+    common wordlist indexes open across profiles; downloads and indexing
+    happen once, up front, in the parent. Output is one <profile>.txt per
+    profile in the --output directory, or with --batch-keyed a single
+    "<profile>\\t<word>" file assembled in input order. A profile that fails
+    is reported and its partial output removed, and the batch goes on;
+    returns the number of failed profiles.
+    """
+    options = generation_options(args)
+    config = {'cache_dir': generator.cache_dir, 'wordlist_checksums': generator.wordlist_checksums,
+              'leet_depth': generator.leet.depth, 'leet_budget': generator.leet.budget}
+    if args.include_common:
+        loaded = []
+        for name in args.common_lists:
+            filename = generator.download_wordlist(name, generator.common_wordlists[name])
+            if filename and generator.open_wordlist_index(name, filename) is not None:
+                loaded.append(name)
+            else:
+                # Left to the workers, every one of them would retry the download into the same .part
+                print(f"[!] Leaving the {name} wordlist out of this batch")
+        options['common_wordlists'] = loaded
+        options['include_common'] = bool(loaded)
+    
+    workers = 1 if args.no_threading else (args.workers or os.cpu_count() or 1)
+    output_dir = os.path.dirname(os.path.abspath(args.output)) if args.batch_keyed else args.output
+    os.makedirs(output_dir, exist_ok=True)
+    keyed_out = open(args.output, 'wb') if args.batch_keyed else None
+    
+    def jobs():
+        used = set()
+        for profile_id, data in iter_batch_profiles(args.batch):
+            stem = re.sub(r'[^\w.-]', '_', profile_id) or 'profile'
+            while stem in used:
+                stem += '_'
+            used.add(stem)
+            if keyed_out:
+                path = os.path.join(output_dir, f".{os.path.basename(args.output)}.{stem}.part")
+            else:
+                path = os.path.join(output_dir, f"{stem}.txt")
+            yield profile_id, data, path
+    
+    start = time.time()
+    profiles = 0
+    total = 0
+    failed = 0
+    # Output of profiles started but not finished, removed if the batch stops early
+    unfinished = set()
+    
+    def finish(profile_id: str, path: str, result: Callable[[], int]):
+        nonlocal profiles, total, failed
+        try:
+            count = result()
+        except Exception as e:
+            failed += 1
+            print(f"[!] {profile_id}: failed: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            unfinished.discard(path)
+            return
+        if keyed_out:
+            with open(path, 'rb') as part:
+                shutil.copyfileobj(part, keyed_out, 1 << 20)
+            os.remove(path)
+            print(f"[+] {profile_id}: {count} words")
+        else:
+            print(f"[+] {profile_id}: {count} words -> {path}")
+        unfinished.discard(path)
+        profiles += 1
+        total += count
+    
+    try:
+        if workers <= 1:
+            _init_batch_worker(config, options)
+            _batch_worker_state['generator'].wordlist_indexes = generator.wordlist_indexes
+            for profile_id, data, path in jobs():
+                unfinished.add(path)
+                finish(profile_id, path, functools.partial(
+                    _run_batch_profile, profile_id, data, path, bool(keyed_out)))
+        else:
+            print(f"[+] Processing profiles on {workers} workers")
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(config, options)) as executor:
+                pending = deque()
+                try:
+                    for profile_id, data, path in jobs():
+                        unfinished.add(path)
+                        pending.append((profile_id, path, executor.submit(
+                            _run_batch_profile, profile_id, data, path, bool(keyed_out))))
+                        while len(pending) >= workers * 2 or (pending and pending[0][2].done()):
+                            profile_id, path, future = pending.popleft()
+                            finish(profile_id, path, future.result)
+                    while pending:
+                        profile_id, path, future = pending.popleft()
+                        finish(profile_id, path, future.result)
+                finally:
+                    for _, _, future in pending:
+                        future.cancel()
+    finally:
+        if keyed_out:
+            keyed_out.close()
+        for path in unfinished:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    print(f"[+] Batch complete: {profiles} profiles, {total} words in {time.time() - start:.1f}s"
+          + (f", {failed} failed" if failed else ""))
+    return failed
+
+def serve(generator: Sherluck, address: Union[str, Tuple[str, int]], args: argparse.Namespace):
+    """
+    --serve: keep one warm Sherluck in memory and generate wordlists on request.
+
+    Speaks HTTP/1.1 on a Unix socket (address is its path) or a loopback TCP
+    (host, port). POST /generate takes a profile, or {"profile": ...,
+    "options": ...} with options overriding the command line's (see
+    generation_options), and streams the candidates back as a chunked
+    text/plain body; GET /health reports the options and loaded wordlists.
+    Common wordlists are downloaded and indexed once, at startup, and the
+    memory-mapped indexes are then frozen (see Sherluck.wordlists_frozen)
+    and shared read-only by all requests; a request may only use the lists
+    loaded. Each request runs single-process on its own thread. Options are
+    cross-checked as on the command line, a bad combination being a 400.
+    """
+    import http.server
+    import signal
+    import socket
+    import socketserver
+    
+    defaults = generation_options(args)
+    if args.include_common:
+        for name in args.common_lists:
+            filename = generator.download_wordlist(name, generator.common_wordlists[name])
+            if filename:
+                generator.open_wordlist_index(name, filename)
+    # Revalidated (if asked) above; requests use the lists as loaded
+    generator.refresh_wordlists = False
+    generator.wordlists_frozen = True
+    
+    def parse_request(body: bytes) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        request = json.loads(body or b'null')
+        if not isinstance(request, dict):
+            raise ValueError("Expected a JSON object")
+        profile, overrides = (request['profile'], request.get('options', {})) if 'profile' in request else (request, {})
+        if not isinstance(profile, dict) or not isinstance(overrides, dict):
+            raise ValueError("profile and options must be JSON objects")
+        options = dict(defaults)
+        for key, value in overrides.items():
+            if key not in defaults:
+                raise ValueError(f"Unknown option: {key} (choose from {', '.join(defaults)})")
+            if key == 'shard':
+                value = parse_shard(str(value)) if value else None
+            elif not (type(value) is type(defaults[key]) or type(value) is int and type(defaults[key]) is float):
+                raise ValueError(f"Option {key} must be of type {type(defaults[key]).__name__}")
+            options[key] = value
+        if options['backend'] == 'numpy' and (options['dedup'] != 'set' or 'dedup' in overrides):
+            raise ValueError("dedup cannot be used with backend numpy, "
+                             "which deduplicates on its own 64-bit fingerprints")
+        if options['backend'] == 'numpy' and options['ranked']:
+            raise ValueError("backend numpy does not support ranked output")
+        if options['budget'] and options['ranked']:
+            raise ValueError("budget cannot be used with ranked")
+        if options['include_common']:
+            missing = [name for name in options['common_wordlists'] if name not in generator.wordlist_indexes]
+            if missing:
+                raise ValueError(f"Wordlists not loaded by this server: {', '.join(map(str, missing))} "
+                                 f"(start it with --include-common --common-lists ...)")
+        return profile, options
+    
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def address_string(self) -> str:
+            # Unix socket peers have no address
+            return self.client_address[0] if self.client_address else 'unix'
+        
+        def log_message(self, format: str, *log_args):
+            print(f"[+] {self.address_string()} {format % log_args}")
+        
+        def send_json(self, status: int, payload: Dict[str, Any]):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def send_chunk(self, data: bytes):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
         
-        print(f"[+] Wordlist saved to {filename} with {count} words")
+        def do_GET(self):
+            if self.path != '/health':
+                self.send_json(404, {'error': f"No such endpoint: GET {self.path}"})
+                return
+            self.send_json(200, {'status': 'ok', 'wordlists': sorted(generator.wordlist_indexes), 'options': defaults})
+        
+        def do_POST(self):
+            if self.path != '/generate':
+                self.send_json(404, {'error': f"No such endpoint: POST {self.path}"})
+                return
+            words = None
+            try:
+                profile, options = parse_request(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+                words = generator.generate_wordlist(profile, weights=profile.get('weights') or {},
+                                                    use_threading=False, encoded=True, **options)
+                # Run up to the first word so that a bad profile or option is still a 400
+                first = next(words, None)
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                if words is not None:
+                    words.close()
+                print(f"[!] Rejected request: {e}")
+                self.send_json(400, {'error': str(e)})
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            start = time.time()
+            count = 0
+            try:
+                batch = []
+                for item in itertools.chain((first,), words) if first is not None else ():
+                    if isinstance(item, bytes):
+                        if batch:
+                            self.send_chunk(('\n'.join(batch) + '\n').encode('utf-8', 'surrogateescape'))
+                            batch = []
+                        self.send_chunk(item)
+                        count += item.count(b'\n')
+                    else:
+                        batch.append(item)
+                        count += 1
+                        if len(batch) >= WRITE_BATCH_WORDS:
+                            self.send_chunk(('\n'.join(batch) + '\n').encode('utf-8', 'surrogateescape'))
+                            batch = []
+                if batch:
+                    self.send_chunk(('\n'.join(batch) + '\n').encode('utf-8', 'surrogateescape'))
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                print(f"[!] Client went away after {count} words")
+                self.close_connection = True
+                return
+            finally:
+                words.close()
+            print(f"[+] Streamed {count} words in {time.time() - start:.1f}s")
+    
+    if isinstance(address, str):
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+        
+        if os.path.exists(address):
+            if not stat.S_ISSOCK(os.stat(address).st_mode):
+                raise OSError(f"{address} exists and is not a socket")
+            os.remove(address)
+        # Only the owner may connect
+        umask = os.umask(0o177)
+        try:
+            server = Server(address, Handler)
+        finally:
+            os.umask(umask)
+        where = f"unix:{address}"
+    else:
+        class Server(http.server.ThreadingHTTPServer):
+            address_family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        
+        server = Server(address, Handler)
+        where = f"http://{address[0]}:{server.server_address[1]}"
+    
+    # A service manager's SIGTERM shuts down as Ctrl-C does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"[+] Serving on {where}: POST /generate, GET /health (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[+] Shutting down")
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+def finish_instrumentation(stats: PipelineStats, args: argparse.Namespace, profiler=None):
+    """Stop the optional cProfile / tracemalloc hooks and write the --stats report"""
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(args.profile_cpu)
+        print(f"[+] CPU profile written to {args.profile_cpu}; top functions by cumulative time:")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(15)
+    
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+        tracemalloc.stop()
+        stats.extra['memory'] = {
+            'peak_bytes': peak,
+            'current_bytes': current,
+            'top_allocations': [{'location': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                                for stat in top],
+        }
+        print(f"[+] Peak traced memory: {peak / 1e6:.1f} MB")
+    
+    for name, stage in stats.stages.items():
+        counts = ', '.join(f"{counter} {stage[counter]}" for counter in PipelineStats.COUNTERS if stage[counter])
+        seconds = f"{stage['seconds']:8.3f}s" if 'seconds' in stage else f"(in {stage['timed_with']})"
+        print(f"[+] {name:<12} {seconds}  {counts}")
+    
+    if args.stats:
+        stats.save(args.stats)
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """--shard I/N (1-based, as John's --node) to generate_wordlist's 0-based (index, count)"""
+    if not value:
+        return None
+    index, _, count = value.partition('/')
+    if not (index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+        raise ValueError(f"--shard expects I/N with 1 <= I <= N, got {value}")
+    return int(index) - 1, int(count)
+
+def parse_serve_address(value: Optional[str]) -> Optional[Union[str, Tuple[str, int]]]:
+    """--serve unix:PATH or [HOST:]PORT to a socket path or (host, port); TCP only on loopback"""
+    if not value:
+        return None
+    if value.startswith('unix:'):
+        if not value[5:]:
+            raise ValueError("--serve unix: needs a socket path")
+        return value[5:]
+    host, _, port = value.rpartition(':')
+    host = host.strip('[]') or '127.0.0.1'
+    if not port.isdigit() or int(port) > 65535:
+        raise ValueError(f"--serve expects unix:PATH or [HOST:]PORT, got {value}")
+    if host != 'localhost':
+        import ipaddress
+        try:
+            loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"--serve only listens on loopback addresses, got {host}")
+    return host, int(port)
+
+def print_plan(plan: Dict[str, Any]):
+    """Human-readable summary of Sherluck.plan_wordlist"""
+    print(f"[+] {plan['keywords']} keywords, {plan['variations']} variations, {plan['numbers']} numbers")
+    print(f"[+] {'stage':<8} {'raw':>14} {'in range':>14} {'allocated':>12} {'bytes':>14}")
+    for name, stage in plan['stages'].items():
+        if name == 'common' and not plan['common_known']:
+            print(f"[+] {name:<8} {'unknown (wordlist not cached and indexed yet)':>56}")
+            continue
+        print(f"[+] {name:<8} {stage['raw']:>14} {stage['in_range']:>14} {stage['allocated']:>12} "
+              f"{stage['allocated_bytes']:>14}")
+    for group, info in plan['groups'].items():
+        print(f"[+]   {group:<14} {info['variations']:>8} variations  {info['allocated']:>12} words")
+    if plan['threshold'] is not None:
+        print(f"[+] Lowest weight kept: {plan['threshold']:.3f}")
+    print(f"[+] Projected output: {plan['words']} of {plan['max_words']} words, "
+          f"{plan['bytes'] / 1e6:.1f} MB before deduplication")
+    if plan['seconds'] is not None:
+        print(f"[+] Estimated generation time: {plan['seconds']:.1f}s (single process)")
 
 def create_template_json():
     template = {
@@ -520,16 +3707,88 @@ def create_template_json():
 def main():
     parser = argparse.ArgumentParser(description="Sherluck - Advanced Personal Data Wordlist Generator")
     parser.add_argument("-i", "--input", help="Input JSON file with personal data")
-    parser.add_argument("-o", "--output", required=True, help="Output wordlist file")
+    parser.add_argument("-o", "--output",
+                       help="Output wordlist file, - for stdout (optional with --john-pipe, a directory with --batch)")
+    parser.add_argument("--compress", choices=['gzip', 'xz', 'bz2', 'zstd'],
+                       help="Compress the output (default: inferred from .gz/.xz/.bz2/.zst extension)")
+    parser.add_argument("--split-every", type=int, metavar="N",
+                       help="Split the output into numbered shard files of N words")
+    parser.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted run from <output>.ckpt, appending to the existing output")
+    parser.add_argument("--checkpoint-every", type=float, default=60.0, metavar="SECONDS",
+                       help="How often to checkpoint plain file output for --resume; 0 disables (default: 60)")
+    parser.add_argument("--delta", metavar="FILE",
+                       help="Write to FILE only the candidates involving keywords that are new or reweighted "
+                            "since the run that wrote --output (read from <output>.manifest.json)")
+    parser.add_argument("--manifest", action="store_true",
+                       help="Record the profile and options in <output>.manifest.json for a later --delta run")
     parser.add_argument("-m", "--max-words", type=int, default=100000, help="Maximum words to generate (default: 100000)")
     parser.add_argument("--min-length", type=int, default=4)
     parser.add_argument("--max-length", type=int, default=30)
-    parser.add_argument("--no-threading", action="store_true", help="Disable multithreading")
+    parser.add_argument("--no-threading", action="store_true", help="Disable parallel generation")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Worker processes for combination expansion (default: 1; only large runs on idle "
+                            "cores gain, since filtering and deduplication stay in one process), and for hash "
+                            "checking and --batch (default: all cores)")
+    parser.add_argument("--backend", default="python", choices=['python', 'numpy'],
+                       help="Combination and numeric stage engine: pure Python (parallel with --workers) or "
+                            "vectorised NumPy (single process, needs numpy) (default: python)")
+    parser.add_argument("--ranked", action="store_true",
+                       help="Emit candidates in descending weight order (single process)")
+    parser.add_argument("--exclusion-index", metavar="FILE",
+                       help="Per-target index of candidates already tried: they are skipped, and this run's "
+                            "are added to it (needs numpy, and exact --dedup on the python backend)")
+    parser.add_argument("--exclude-pot", action="append", default=[], metavar="POTFILE",
+                       help="Add the passwords of a John potfile to --exclusion-index (repeatable)")
+    parser.add_argument("--shard", metavar="I/N",
+                       help="Generate only shard I (1..N) of N disjoint shards of the candidates, split by hash "
+                            "and numbered as John's --node; --max-words and the other limits apply to each "
+                            "shard on its own (faster with numpy installed)")
+    parser.add_argument("--depth", type=int, default=2,
+                       help="Longest keyword combination; beyond 2 words a beam search picks them (default: 2)")
+    parser.add_argument("--beam-width", type=int, default=1000,
+                       help="Partial combinations kept per step of the --depth beam search (default: 1000)")
+    parser.add_argument("--dedup", choices=list(DEDUP_BACKENDS),
+                       help="Duplicate filter: exact set (fast), exact 64-bit hash table (compact) "
+                            "or Bloom filter (smallest, may drop a few words) (python backend, default: set)")
+    parser.add_argument("--dedup-fpr", type=float, default=0.001,
+                       help="False-positive rate for --dedup bloom (default: 0.001)")
+    parser.add_argument("--budget", action="store_true",
+                       help="Split --max-words between single words, pairs and common lists by weight")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="Print per-stage size, weight threshold and time estimates without generating")
+    parser.add_argument("--leet-depth", type=int, default=1,
+                       help="Most character positions substituted at once in leet variations (default: 1); "
+                            "each size above 1 is kept budget/(depth+1) of the --leet-budget")
+    parser.add_argument("--leet-budget", type=int, default=8,
+                       help="Leet and case variations kept per keyword (default: 8, at least depth+1 with --leet-depth)")
     parser.add_argument("--include-common", action="store_true", help="Include common wordlists")
     parser.add_argument("--common-lists", nargs='+', default=['rockyou'], 
                        choices=['rockyou', 'common_passwords', 'english_words'],
                        help="Common wordlists to include")
+    parser.add_argument("--cache-dir", help="Download cache for common wordlists (default: $SHERLUCK_CACHE_DIR or ./wordlists)")
+    parser.add_argument("--refresh-lists", action="store_true",
+                       help="Revalidate cached wordlists against the server (ETag / Last-Modified)")
+    parser.add_argument("--list-checksum", action="append", default=[], metavar="NAME=SHA256",
+                       help="Expected SHA-256 of a common wordlist; may be repeated")
+    parser.add_argument("--batch", metavar="SOURCE",
+                       help="Generate for many profiles: a directory of JSON files, a JSONL file, or - for JSONL on stdin")
+    parser.add_argument("--batch-keyed", action="store_true",
+                       help="With --batch, write one <profile>\\t<word> file to --output instead of a wordlist per profile")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                       help="Run as a daemon keeping the tables and common wordlist indexes loaded, streaming a "
+                            "wordlist per profile POSTed to /generate; ADDRESS is unix:PATH or loopback [HOST:]PORT")
+    parser.add_argument("--stats", metavar="FILE", help="Write per-stage timings and counters as JSON")
+    parser.add_argument("--profile-cpu", metavar="FILE", help="Profile the run with cProfile and dump it to FILE")
+    parser.add_argument("--trace-memory", action="store_true",
+                       help="Track allocations with tracemalloc (slow) and report peak memory")
     parser.add_argument("--create-template", action="store_true", help="Create a template JSON file")
+    parser.add_argument("--emit-rules", action="store_true",
+                       help="Write base words to --output plus a rule file instead of expanded variations")
+    parser.add_argument("--rules-format", default="john", choices=['john', 'hashcat'],
+                       help="Rule syntax for --emit-rules (default: john)")
+    parser.add_argument("--rules-output",
+                       help="Rule file for --emit-rules (default: <output>.conf for john, <output>.rule for hashcat)")
     
     # John the Ripper integration arguments
     parser.add_argument("--john", action="store_true", help="Run John the Ripper after generating wordlist")
@@ -537,9 +3796,22 @@ def main():
     parser.add_argument("--john-target", nargs='+', help="Target files for John the Ripper")
     parser.add_argument("--john-format", help="Hash format for John the Ripper")
     parser.add_argument("--john-rules", action="store_true", help="Use rules with John the Ripper")
+    parser.add_argument("--john-pipe", action="store_true",
+                       help="Stream candidates into John over stdin while generating instead of writing a wordlist")
+    parser.add_argument("--john-binary", default="john", help="John the Ripper executable for --john-pipe")
+    parser.add_argument("--verify-hashes", metavar="FILE",
+                       help="Check candidates against the hashes in FILE while generating (needs --format)")
+    parser.add_argument("--format", choices=list(HashVerifier.FORMATS),
+                       help="Hash format for --verify-hashes")
+    parser.add_argument("--potfile", default="sherluck.pot",
+                       help="John-format potfile that --verify-hashes appends hits to (default: sherluck.pot)")
     
     args = parser.parse_args()
     
+    if args.output == '-' and not args.batch:
+        # The wordlist owns stdout; status messages go to stderr
+        sys.stdout = sys.stderr
+    
     print("""
     ███████╗██╗  ██╗███████╗██████╗ ██╗      ██╗   ██╗ ██████╗██╗  ██╗
     ██╔════╝██║  ██║██╔════╝██╔══██╗██║      ██║   ██║██╔════╝██║ ██╔╝
@@ -556,16 +3828,183 @@ def main():
         create_template_json()
         return
     
-    if not args.input:
+    if not args.input and not args.batch and not args.serve:
         print("Error: You must specify an input file")
         print("Use --create-template to generate a template JSON file")
         sys.exit(1)
     
+    if args.john_pipe and not args.john_target:
+        print("Error: --john-pipe needs target files via --john-target")
+        sys.exit(1)
+    if args.backend == 'numpy' and args.ranked:
+        print("Error: --backend numpy cannot be used with --ranked")
+        sys.exit(1)
+    if args.verify_hashes and not args.format:
+        print("Error: --verify-hashes needs the hash format via --format")
+        sys.exit(1)
+    if args.budget and args.ranked:
+        print("Error: --budget cannot be used with --ranked")
+        sys.exit(1)
+    try:
+        shard = parse_shard(args.shard)
+        address = parse_serve_address(args.serve)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if shard and (args.delta or args.resume):
+        print("Error: --shard cannot be used with --delta or --resume")
+        sys.exit(1)
+    if args.exclude_pot and not args.exclusion_index:
+        print("Error: --exclude-pot needs --exclusion-index")
+        sys.exit(1)
+    if args.backend == 'numpy' and args.dedup:
+        print("Error: --dedup cannot be used with --backend numpy, which deduplicates on its own 64-bit fingerprints")
+        sys.exit(1)
+    if args.backend == 'numpy' and args.workers is not None and not (args.verify_hashes or args.batch):
+        print("[!] --workers has no effect here: --backend numpy generates in a single process")
+    elif args.backend == 'python' and (args.workers or 1) > 1 and not (args.batch or args.ranked or args.no_threading):
+        # The parent filters and deduplicates every word, and that is most of the run
+        print(f"[!] --workers {args.workers} only parallelises combination expansion (about a sixth of a "
+              f"python run); expect little or no speedup, none on runs under a few million words")
+    args.dedup = args.dedup or 'set'
+    if args.exclusion_index and args.backend == 'python' and args.dedup == 'bloom':
+        print("Error: --exclusion-index needs exact deduplication; use --dedup set or hash")
+        sys.exit(1)
+    if args.exclusion_index and args.backend == 'python' and not args.batch:
+        print("[!] With --exclusion-index the python backend fingerprints every candidate in pure Python, "
+              "about 4x slower than without; --backend numpy does it vectorised")
+    if args.serve and args.batch:
+        print("Error: --serve cannot be used with --batch")
+        sys.exit(1)
+    if not args.output and not args.john_pipe and not args.dry_run and not args.serve:
+        print("Error: You must specify an output file with -o/--output")
+        sys.exit(1)
+    if args.john and not (args.john_pipe or args.dry_run or args.serve or args.batch):
+        # Checked up front so a bad combination fails before a long generation
+        destination = args.delta or args.output
+        if not args.john_target:
+            print("Error: --john needs target files via --john-target")
+            sys.exit(1)
+        if destination == '-' or args.split_every or args.compress \
+                or os.path.splitext(destination)[1].lower() in WordlistWriter.EXTENSIONS:
+            print("Error: --john needs a single uncompressed wordlist file; use --john-pipe instead")
+            sys.exit(1)
+    
     generator = Sherluck()
+    try:
+        generator.leet = LeetEngine(args.leet_depth, args.leet_budget)
+    except ValueError as e:
+        print(f"Error: --leet-depth {args.leet_depth} cannot take effect: {e}")
+        sys.exit(1)
+    if args.cache_dir:
+        generator.cache_dir = args.cache_dir
+    generator.refresh_wordlists = args.refresh_lists
+    for entry in args.list_checksum:
+        name, _, digest = entry.partition('=')
+        if not digest:
+            print(f"Error: --list-checksum expects NAME=SHA256, got {entry}")
+            sys.exit(1)
+        generator.wordlist_checksums[name] = digest
+    
+    if args.serve:
+        try:
+            serve(generator, address, args)
+        except OSError as e:
+            print(f"Error: cannot serve on {args.serve}: {e}")
+            sys.exit(1)
+        return
+    
+    if args.batch:
+        if not args.output:
+            print("Error: --batch needs -o/--output (a directory, or a file with --batch-keyed)")
+            sys.exit(1)
+        if run_batch(generator, args):
+            sys.exit(1)
+        return
     
     data = generator.load_data(args.input)
     weights = data.get('weights', {})
     
+    if args.dry_run:
+        print_plan(generator.plan_wordlist(data, args.max_words, args.min_length, args.max_length, weights,
+                                           args.include_common, args.common_lists))
+        return
+    
+    if args.emit_rules:
+        if not args.output:
+            print("Error: --emit-rules needs an output file with -o/--output")
+            sys.exit(1)
+        emit_rules(generator, data, weights, args)
+        return
+    
+    # A --delta run extends the manifest it read, so the next one builds on both
+    manifest_path = args.output + '.manifest.json' if args.output and args.output != '-' else None
+    if args.manifest and (not manifest_path or shard or args.john_pipe):
+        # A shard holds too little of the output for a --delta run to diff against
+        print("Error: --manifest needs an output file as -o/--output and cannot be used with --shard or --john-pipe")
+        sys.exit(1)
+    previous = None
+    exclude = ()
+    if args.delta:
+        if not manifest_path or args.john_pipe or args.ranked or args.budget:
+            print("Error: --delta needs the previous run's output file as -o/--output and cannot be used with --ranked, --budget or --john-pipe")
+            sys.exit(1)
+        if not os.path.exists(manifest_path):
+            print(f"Error: No manifest at {manifest_path}; run a full generation to {args.output} with --manifest first")
+            sys.exit(1)
+        previous = generator.load_data(manifest_path)
+        missing = [path for path in previous['files'] if not os.path.exists(path)]
+        if missing:
+            print(f"[!] Previous output missing, its words may be repeated: {', '.join(missing)}")
+        exclude = itertools.chain.from_iterable(read_wordlist(path) for path in previous['files']
+                                                if os.path.exists(path))
+    
+    checkpoint = None
+    resumable = not (args.john_pipe or args.ranked or args.delta or shard or args.output == '-' or args.split_every
+                     or args.compress or os.path.splitext(args.output)[1].lower() in WordlistWriter.EXTENSIONS)
+    if args.resume and not resumable:
+        print("Error: --resume needs a single uncompressed output file and cannot be used with --ranked, --delta or --john-pipe")
+        sys.exit(1)
+    if resumable and (args.resume or args.checkpoint_every > 0):
+        fingerprint = GenerationCheckpoint.make_fingerprint(data, {
+            # With --budget or --depth, how the output is split depends on max_words
+            'max_words': args.max_words, 'min_length': args.min_length, 'max_length': args.max_length,
+            'include_common': args.include_common, 'common_lists': args.common_lists,
+            'dedup': args.dedup, 'dedup_fpr': args.dedup_fpr,
+            'leet_depth': args.leet_depth, 'leet_budget': args.leet_budget, 'budget': args.budget,
+            'depth': args.depth, 'beam_width': args.beam_width,
+            'exclusion_index': args.exclusion_index, 'exclude_pot': args.exclude_pot,
+        })
+        interval = args.checkpoint_every if args.checkpoint_every > 0 else float('inf')
+        if args.resume:
+            try:
+                checkpoint = GenerationCheckpoint.load(args.output, fingerprint, interval)
+            except (OSError, ValueError) as e:
+                print(f"Error: cannot resume: {e}")
+                sys.exit(1)
+        else:
+            checkpoint = GenerationCheckpoint(args.output, fingerprint, interval)
+    
+    exclusion = None
+    if args.exclusion_index:
+        try:
+            exclusion = ExclusionIndex(args.exclusion_index)
+            for potfile in args.exclude_pot:
+                print(f"[+] Imported {exclusion.import_potfile(potfile)} passwords from {potfile}")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error: cannot use exclusion index {args.exclusion_index}: {e}")
+            sys.exit(1)
+        print(f"[+] Skipping {len(exclusion)} candidates already tried (from {args.exclusion_index})")
+    
+    stats = PipelineStats()
+    profiler = None
+    if args.profile_cpu:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.trace_memory:
+        tracemalloc.start()
+    
     print(f"[+] Generating up to {args.max_words} words...")
     wordlist_generator = generator.generate_wordlist(
         data=data,
@@ -575,24 +4014,102 @@ def main():
         use_threading=not args.no_threading,
         weights=weights,
         include_common=args.include_common,
-        common_wordlists=args.common_lists
+        common_wordlists=args.common_lists,
+        workers=args.workers,
+        ranked=args.ranked,
+        dedup=args.dedup,
+        dedup_fpr=args.dedup_fpr,
+        stats=stats,
+        checkpoint=checkpoint,
+        previous=previous,
+        exclude=exclude,
+        backend=args.backend,
+        encoded=not args.john_pipe,
+        budget=args.budget,
+        depth=args.depth,
+        beam_width=args.beam_width,
+        shard=shard,
+        exclusion=exclusion
     )
     
-    generator.save_wordlist(wordlist_generator, args.output, args.max_words)
+    verifier = None
+    if args.verify_hashes:
+        workers = 1 if args.no_threading else (args.workers or os.cpu_count() or 1)
+        verifier = HashVerifier(args.format, args.potfile, workers)
+        try:
+            loaded = verifier.load(args.verify_hashes)
+        except OSError as e:
+            print(f"Error: cannot read {args.verify_hashes}: {e}")
+            sys.exit(1)
+        if not loaded:
+            print(f"Error: no {args.format} hashes found in {args.verify_hashes}")
+            sys.exit(1)
+        print(f"[+] Checking candidates against {loaded} {args.format} hashes on {workers} workers")
+        # Only what save_wordlist or John takes gets checked
+        wordlist_generator = verifier.watch(wordlist_generator,
+                                            args.max_words - (checkpoint.words if checkpoint is not None else 0))
+    
+    def finish_stream():
+        if verifier is not None:
+            wordlist_generator.close()
+            verifier.report()
+            stats.extra['cracked'] = len(verifier.cracked)
+        if exclusion is not None:
+            # Only a run that got this far has had its candidates tried
+            added = exclusion.save()
+            stats.extra['excluded_next_time'] = len(exclusion)
+            print(f"[+] Exclusion index {args.exclusion_index} now holds {len(exclusion)} candidates ({added} new)")
     
-    # John the Ripper integration
-    if args.john:
-        if not args.john_target:
-            print("[!] Please specify target files for John the Ripper using --john-target")
-        else:
-            print("[+] Starting John the Ripper...")
-            generator.run_john_the_ripper(
-                command_key=args.john_command,
-                wordlist_path=args.output,
+    if args.john_pipe:
+        generator.john_binary = args.john_binary
+        with stats.timer('stream'):
+            generator.run_john_pipe(
+                wordlist_generator,
                 target_files=args.john_target,
                 format_type=args.john_format,
                 rules=args.john_rules
             )
+        if args.output:
+            print(f"[!] Nothing was written to {args.output}: --john-pipe streams candidates directly")
+        finish_stream()
+        finish_instrumentation(stats, args, profiler)
+        print("[+] Generation complete!")
+        return
+    
+    # Generation is lazy, so this covers generation and writing together
+    destination = args.delta or args.output
+    with stats.timer('stream'):
+        try:
+            count = generator.save_wordlist(wordlist_generator, destination, args.max_words,
+                                            compression=args.compress, split_every=args.split_every,
+                                            checkpoint=checkpoint)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    finish_stream()
+    finish_instrumentation(stats, args, profiler)
+    
+    if args.manifest or args.delta:
+        files = [destination]
+        if args.split_every:
+            writer = WordlistWriter(destination, args.compress, args.split_every)
+            files = [writer.shard_path(index) for index in range(max(1, -(-count // args.split_every)))]
+        if previous is not None:
+            files = previous['files'] + files
+            count += previous['words']
+        options = generator.manifest_options(args.min_length, args.max_length)
+        generator.save_manifest(generator.build_manifest(data, weights, options, files, count), manifest_path)
+    
+    # John the Ripper integration
+    if args.john:
+        print("[+] Starting John the Ripper...")
+        generator.run_john_the_ripper(
+            command_key=args.john_command,
+            wordlist_path=destination,
+            target_files=args.john_target,
+            format_type=args.john_format,
+            rules=args.john_rules
+        )
     
     print("[+] Generation complete!")
 
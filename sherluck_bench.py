@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Stage-level benchmarks for Sherluck.
+
+Builds synthetic profiles shaped like sherluck_template.json with a growing
+number of keywords, times each pipeline stage on its own and end to end, and
+writes the results as JSON. When numpy is installed, the vectorised
+backend's combined combination + numeric stage and end-to-end run are timed
+as well. Passing --baseline compares against a previous results file and
+exits with status 1 when a stage regresses.
+
+    python sherluck_bench.py -o bench.json
+    python sherluck_bench.py --baseline bench.json --tolerance 0.15
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from sherluck import FingerprintDeduplicator, NumpyProductEngine, Sherluck
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sherluck_template.json')
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'sa', 'lu', 'vor', 'den', 'ni', 'sha', 'el', 'bar', 'qui', 'to', 'zan']
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def synthetic_profile(keyword_count: int, seed: int = 1337) -> Dict[str, Any]:
+    """
+    A profile with the template's fields whose values are synthetic words,
+    grown round-robin until extract_keywords yields keyword_count keywords.
+    Only the first date field is kept, so small sizes aren't all dates.
+    """
+    with open(TEMPLATE_PATH, 'r') as f:
+        template = json.load(f)
+
+    rng = random.Random(seed)
+    generator = Sherluck()
+    date_fields = {field for field, value in template.items()
+                   if any(generator.dates.parse(str(item)) for item in generator.ensure_list(value))}
+    first_date = next(field for field in template if field in date_fields)
+    profile = {first_date: template[first_date]}
+    fields = [field for field in template if field not in date_fields]
+    base_count = len(list(generator.extract_keywords(profile)))
+
+    # Only some fields are read by extract_keywords; find them once
+    used_fields = [field for field in fields
+                   if len(list(generator.extract_keywords({**profile, field: 'probe'}))) > base_count]
+    if not used_fields:
+        raise RuntimeError("No template field contributes keywords")
+
+    for index in range(max(keyword_count - base_count, 0)):
+        field = used_fields[index % len(used_fields)]
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        profile.setdefault(field, []).append(word.capitalize() if rng.random() < 0.5 else word)
+    return profile
+
+
+def measure(label: str, size: int, run: Callable[[], Tuple[int, int]], track_memory: bool,
+            repeat: int = 3) -> Dict[str, Any]:
+    """
+    Best-of-`repeat` wall time of run(), which returns (candidates,
+    bytes_written); optionally one more run under tracemalloc for peak memory.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            candidates, bytes_written = run()
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+        peak = None
+        if track_memory:
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {
+        'size': size,
+        'stage': label,
+        'candidates': candidates,
+        'seconds': round(seconds, 6),
+        'candidates_per_sec': round(candidates / seconds, 1) if seconds > 0 else None,
+        'peak_bytes': peak,
+        'bytes_written': bytes_written,
+    }
+
+
+def count(iterable: Iterable[Any], limit: int) -> int:
+    total = 0
+    for _ in iterable:
+        total += 1
+        if total >= limit:
+            break
+    return total
+
+
+def bench_size(size: int, limit: int, track_memory: bool, repeat: int = 3) -> List[Dict[str, Any]]:
+    generator = Sherluck()
+    profile = synthetic_profile(size)
+    keywords = list(generator.extract_keywords(profile))
+    sources = {}
+    variations = generator.collect_variations(keywords, sources=sources)
+    # The same numbers generate_wordlist uses, date concatenations included
+    date_values = generator.date_values(profile)
+    date_components = generator.dates.components(date_values)
+    date_patterns = generator.dates.patterns(date_values)
+    numbers = generator.date_numbers(profile)
+    words = [word for word, _ in itertools.islice(generator.generate_combinations(variations, None), limit)]
+    results = []
+
+    def variations_stage():
+        return sum(1 for word, weight in keywords for _ in generator.generate_word_variations(word, weight)), 0
+
+    def combinations_stage():
+        return count(generator.generate_combinations(variations, None), limit), 0
+
+    def beam_stage():
+        # 3- and 4-word combinations, which exhaustively would be n^3 + n^4
+        return count(generator.generate_beam_candidates(variations, 4, sources=sources), limit), 0
+
+    def numeric_stage():
+        return count(generator.add_numeric_patterns(variations, date_components, None,
+                                                    date_patterns=date_patterns), limit), 0
+
+    def numpy_stage():
+        # Both stages at once, as --backend numpy runs them
+        engine = NumpyProductEngine(variations, numbers, 0, 1 << 30,
+                                    FingerprintDeduplicator(limit))
+        total = 0
+        for index in itertools.count():
+            chunk = engine.chunk(index, limit - total)
+            if chunk is None:
+                break
+            total += chunk[1]
+            if total >= limit:
+                break
+        return total, 0
+
+    def save_stage():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'wordlist.txt')
+            written = generator.save_wordlist(iter(words), path, limit)
+            return written, os.path.getsize(path)
+
+    def end_to_end():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'wordlist.txt')
+            wordlist = generator.generate_wordlist(profile, max_words=limit, use_threading=False)
+            written = generator.save_wordlist(wordlist, path, limit)
+            return written, os.path.getsize(path)
+
+    def end_to_end_numpy():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'wordlist.txt')
+            wordlist = generator.generate_wordlist(profile, max_words=limit, backend='numpy', encoded=True)
+            written = generator.save_wordlist(wordlist, path, limit)
+            return written, os.path.getsize(path)
+
+    stages = [('variations', variations_stage), ('combinations', combinations_stage),
+              ('beam', beam_stage), ('numeric', numeric_stage), ('save', save_stage), ('end_to_end', end_to_end)]
+    if numpy is not None:
+        stages[4:4] = [('numpy', numpy_stage)]
+        stages.append(('end_to_end_numpy', end_to_end_numpy))
+    for label, run in stages:
+        result = measure(label, size, run, track_memory, repeat)
+        result['keywords'] = len(keywords)
+        results.append(result)
+        print(f"[+] {size:>5} keywords  {label:<16} {result['candidates']:>9} candidates  "
+              f"{result['seconds']:8.3f}s  {result['candidates_per_sec'] or 0:>12.0f}/s"
+              + (f"  peak {result['peak_bytes'] / 1e6:.1f} MB" if result['peak_bytes'] is not None else ''))
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Describe every stage whose throughput dropped or peak memory grew by more than tolerance"""
+    previous = {(entry['size'], entry['stage']): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry['size'], entry['stage']))
+        if old is None:
+            continue
+        key = f"{entry['stage']} @ {entry['size']} keywords"
+        if old.get('candidates_per_sec') and entry.get('candidates_per_sec'):
+            ratio = entry['candidates_per_sec'] / old['candidates_per_sec']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{key}: throughput {ratio:.0%} of baseline")
+        if old.get('peak_bytes') and entry.get('peak_bytes'):
+            ratio = entry['peak_bytes'] / old['peak_bytes']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key}: peak memory {ratio:.0%} of baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sherluck stage benchmarks")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Results file (default: bench_results.json)")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                       help="Profile sizes in keywords (default: 10 100 1000)")
+    parser.add_argument("--limit", type=int, default=200000,
+                       help="Candidates taken from each unbounded stage (default: 200000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept (default: 3)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass for peak memory")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                       help="Allowed relative slowdown / memory growth before flagging (default: 0.2)")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(bench_size(size, args.limit, not args.no_memory, args.repeat))
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'limit': args.limit,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"[+] Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"[!] Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"[+] No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
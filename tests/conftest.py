@@ -0,0 +1,14 @@
+import json
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+@pytest.fixture
+def profile():
+    with open(os.path.join(REPO, 'sherluck_template.json')) as f:
+        return json.load(f)
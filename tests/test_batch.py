@@ -0,0 +1,43 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from sherluck import Sherluck, run_batch
+
+
+def batch_args(tmp_path, **overrides):
+    options = dict(max_words=500, min_length=4, max_length=30, include_common=False, common_lists=['rockyou'],
+                   ranked=False, dedup='set', dedup_fpr=0.001, backend='python', budget=False, depth=2,
+                   beam_width=1000, shard=None, no_threading=False, workers=None, batch_keyed=False,
+                   batch=str(tmp_path / 'profiles.jsonl'), output=str(tmp_path / 'out'))
+    options.update(overrides)
+    return argparse.Namespace(**options)
+
+
+def write_profiles(tmp_path, profiles):
+    with open(tmp_path / 'profiles.jsonl', 'w') as f:
+        for data in profiles:
+            f.write(json.dumps(data) + '\n')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failed_profile_does_not_stop_batch(tmp_path, workers):
+    write_profiles(tmp_path, [{'profile_id': 'a', 'firstname': 'alice'},
+                              {'profile_id': 'bad', 'firstname': 'bob', 'weights': 'not an object'},
+                              {'profile_id': 'c', 'firstname': 'carol'}])
+    args = batch_args(tmp_path, workers=workers, batch_keyed=True, output=str(tmp_path / 'keyed.txt'))
+    assert run_batch(Sherluck(), args) == 1
+    
+    rows = open(tmp_path / 'keyed.txt').read().splitlines()
+    assert {row.split('\t')[0] for row in rows} == {'a', 'c'}
+    assert sorted(os.listdir(tmp_path)) == ['keyed.txt', 'profiles.jsonl']
+
+
+def test_failed_profile_leaves_no_partial_file(tmp_path):
+    write_profiles(tmp_path, [{'profile_id': 'bad', 'firstname': 'bob', 'weights': 'not an object'},
+                              [1, 2, 3],
+                              {'profile_id': 'good', 'firstname': 'alice'}])
+    assert run_batch(Sherluck(), batch_args(tmp_path, workers=1)) == 1
+    assert os.listdir(tmp_path / 'out') == ['good.txt']
@@ -0,0 +1,30 @@
+import itertools
+
+from sherluck import Sherluck
+
+
+def test_equal_weights_spread_the_beam():
+    keywords = [(f"word{i}", 1.0) for i in range(50)]
+    beam = list(Sherluck.iter_beam_combinations(keywords, depth=3, beam_width=100))
+    assert len(beam) == 100
+    assert len({indices[0] for indices, _ in beam}) >= 25
+
+
+def test_each_depth_in_descending_weight():
+    keywords = [(f"word{i}", weight) for i, weight in enumerate([5, 4, 4, 3, 2, 2, 1])]
+    beam = list(Sherluck.iter_beam_combinations(keywords, depth=4, beam_width=20))
+    for _, group in itertools.groupby(beam, key=lambda item: len(item[0])):
+        weights = [weight for _, weight in group]
+        assert weights == sorted(weights, reverse=True)
+
+
+def test_no_combination_repeats_a_base_keyword():
+    sources = {}
+    variations = Sherluck().collect_variations([('john', 1.0), ('smith', 1.0), ('rex', 1.0)], sources=sources)
+    ordered = sorted(variations, key=lambda item: -item[1])
+    ids = [sources[word] for word, _ in ordered]
+    beam = list(Sherluck.iter_beam_combinations(ordered, depth=4, beam_width=1000, sources=ids))
+    # Only 3-word combinations exist, each of all three base keywords
+    assert beam and {len(indices) for indices, _ in beam} == {3}
+    for indices, _ in beam:
+        assert sorted(ids[index] for index in indices) == [0, 1, 2]
@@ -0,0 +1,29 @@
+from sherluck import PipelineStats, Sherluck
+
+
+def generator_with_common(tmp_path):
+    common = tmp_path / 'common.txt'
+    common.write_text(''.join(f"ab{i}\n" for i in range(50000)) + ''.join(f"longcommon{i}\n" for i in range(5000)))
+    generator = Sherluck()
+    generator.download_wordlist = lambda name, url: str(common)
+    return generator
+
+
+def test_common_words_respect_min_length(tmp_path):
+    generator = generator_with_common(tmp_path)
+    # A fifth of max_words goes to the common lists, all of it to in-range words
+    words = list(generator.generate_wordlist({'firstname': 'Ann'}, max_words=200000, min_length=8, use_threading=False,
+                                             include_common=True))
+    assert 'longcommon0' in words and 'longcommon999' in words
+    assert all(len(word) >= 8 for word in words)
+
+
+def test_budget_is_split_across_keyword_groups(profile, tmp_path):
+    generator = generator_with_common(tmp_path)
+    stats = PipelineStats()
+    words = list(generator.generate_wordlist(profile, max_words=20000, use_threading=False, include_common=True,
+                                             budget=True, stats=stats))
+    assert len(words) == 20000
+    groups = stats.extra['budget_groups']
+    assert {'basic', 'dates'} <= set(groups) and 'all' not in groups
+    assert sum(groups.values()) <= stats.extra['budget']['words'] + stats.extra['budget']['pairs']
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from conftest import REPO
+
+
+def run(tmp_path, *args):
+    command = [sys.executable, os.path.join(REPO, 'sherluck.py'), '-i', os.path.join(REPO, 'sherluck_template.json'),
+               '-m', '2000', '-o', 'out.txt', *args]
+    return subprocess.run(command, cwd=tmp_path, capture_output=True, text=True)
+
+
+def test_numpy_backend_rejects_dedup(tmp_path):
+    result = run(tmp_path, '--backend', 'numpy', '--dedup', 'bloom')
+    assert result.returncode == 1
+    assert 'Error: --dedup cannot be used with --backend numpy' in result.stdout
+    assert not (tmp_path / 'out.txt').exists()
+
+
+def test_numpy_backend_warns_about_workers(tmp_path):
+    result = run(tmp_path, '--backend', 'numpy', '--workers', '4')
+    assert result.returncode == 0
+    assert '[!] --workers has no effect here' in result.stdout
+    assert 'has no effect here' not in run(tmp_path, '--workers', '4').stdout
+
+
+def test_python_workers_note(tmp_path):
+    assert 'only parallelises combination expansion' in run(tmp_path, '--workers', '2').stdout
+    assert 'only parallelises' not in run(tmp_path, '--workers', '1').stdout
@@ -0,0 +1,93 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from sherluck import Sherluck
+
+BODY = b''.join(b"password%d\n" % i for i in range(5000))
+ETAG = '"v1"'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Serves BODY with an ETag, honouring If-None-Match, Range and If-Range"""
+    
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range') == ETAG:
+            start = int(byte_range.split('=')[1].rstrip('-'))
+        self.send_response(206 if start else 200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(BODY) - start))
+        if start:
+            self.send_header('Content-Range', f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        self.end_headers()
+        self.wfile.write(BODY[start:])
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}/list.txt"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_then_304(server, tmp_path):
+    httpd, url = server
+    generator = Sherluck()
+    path = generator.download_wordlist('list', url, str(tmp_path))
+    assert open(path, 'rb').read() == BODY
+    meta = json.load(open(f"{path}.meta.json"))
+    assert meta['etag'] == ETAG and meta['size'] == len(BODY)
+    
+    assert generator.download_wordlist('list', url, str(tmp_path), refresh=True) == path
+    assert httpd.requests[-1]['If-None-Match'] == ETAG
+    assert open(path, 'rb').read() == BODY
+    assert len(httpd.requests) == 2
+
+
+def test_partial_download_resumes_with_range(server, tmp_path):
+    httpd, url = server
+    part = tmp_path / 'list.txt.part'
+    part.write_bytes(BODY[:1000])
+    (tmp_path / 'list.txt.part.meta.json').write_text(json.dumps({'url': url, 'etag': ETAG}))
+    
+    path = Sherluck().download_wordlist('list', url, str(tmp_path))
+    assert httpd.requests[-1]['Range'] == 'bytes=1000-'
+    assert httpd.requests[-1]['If-Range'] == ETAG
+    assert open(path, 'rb').read() == BODY
+    assert not part.exists()
+
+
+def test_changed_source_restarts_with_200(server, tmp_path):
+    httpd, url = server
+    (tmp_path / 'list.txt.part').write_bytes(b'old version of the list\n')
+    (tmp_path / 'list.txt.part.meta.json').write_text(json.dumps({'url': url, 'etag': '"v0"'}))
+    
+    path = Sherluck().download_wordlist('list', url, str(tmp_path))
+    assert httpd.requests[-1]['If-Range'] == '"v0"'
+    assert open(path, 'rb').read() == BODY
+
+
+@pytest.mark.parametrize('leftover', ['list.txt', 'list.txt.part'])
+def test_unvalidated_leftover_is_not_resumed(server, tmp_path, leftover):
+    httpd, url = server
+    (tmp_path / leftover).write_bytes(b'unrelated content\n')
+    
+    path = Sherluck().download_wordlist('list', url, str(tmp_path))
+    assert 'Range' not in httpd.requests[-1]
+    assert open(path, 'rb').read() == BODY
@@ -0,0 +1,61 @@
+import pytest
+
+from sherluck import ExclusionIndex, LeetEngine, Sherluck
+
+# Latin-1 bytes that aren't UTF-8, as read back from a file with surrogateescape
+CAFE = 'caf\udce9'
+
+
+def generate(exclusion=None, backend='numpy', max_words=10 ** 6):
+    generator = Sherluck()
+    generator.leet = LeetEngine(1, 2)
+    return list(generator.generate_wordlist({'firstname': CAFE, 'pet_name': 'Rex'}, max_words,
+                                            backend=backend, exclusion=exclusion))
+
+
+@pytest.fixture
+def potfile(tmp_path):
+    path = tmp_path / 'john.pot'
+    path.write_bytes(b'$dynamic_0$0123456789abcdef0123456789abcdef:$HEX[636166e9]\n'
+                     b'$dynamic_0$fedcba9876543210fedcba9876543210:$HEX[636166e931]\n')
+    return str(path)
+
+
+def test_potfile_bytes_match_surrogateescaped_words(tmp_path, potfile):
+    index = ExclusionIndex(str(tmp_path / 'tried.idx'))
+    assert index.import_potfile(potfile) == 2
+    assert index.keep([CAFE, CAFE + '1', 'caf\xe9']).tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_imported_passwords_are_not_generated(tmp_path, potfile, backend):
+    assert {CAFE, CAFE + '1'} <= set(generate(backend=backend))
+    index = ExclusionIndex(str(tmp_path / 'tried.idx'))
+    index.import_potfile(potfile)
+    assert not {CAFE, CAFE + '1'} & set(generate(index, backend))
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_next_run_skips_what_was_saved(tmp_path, backend):
+    path = str(tmp_path / 'tried.idx')
+    index = ExclusionIndex(path)
+    first = generate(index, backend, max_words=5000)
+    assert index.save() == len(first) == 5000
+    second = generate(ExclusionIndex(path), backend)
+    assert not set(first) & set(second)
+    assert sorted(first + second) == sorted(generate(backend=backend))
+
+
+def test_only_emitted_words_are_recorded(tmp_path):
+    index = ExclusionIndex(str(tmp_path / 'tried.idx'))
+    words = Sherluck().generate_wordlist({'firstname': 'Ann'}, 10 ** 6, backend='python', exclusion=index)
+    taken = [next(words) for _ in range(100)]
+    words.close()
+    assert index.save() == 100
+    assert not any(index.keep(taken).tolist())
+
+
+def test_bloom_dedup_is_refused(tmp_path):
+    with pytest.raises(ValueError, match='exact deduplication'):
+        list(Sherluck().generate_wordlist({'firstname': 'Ann'}, backend='python', dedup='bloom',
+                                          exclusion=ExclusionIndex(str(tmp_path / 'tried.idx'))))
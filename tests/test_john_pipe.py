@@ -0,0 +1,86 @@
+import os
+import stat
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from sherluck import Sherluck
+
+# Stands in for john: records its arguments and stdin, then exits as told
+STUB = textwrap.dedent('''\
+    import os, sys
+    with open(os.environ['STUB_ARGS'], 'w') as f:
+        f.write('\\n'.join(sys.argv[1:]))
+    if os.environ.get('STUB_READ', '1') == '1':
+        with open(os.environ['STUB_STDIN'], 'wb') as f:
+            f.write(sys.stdin.buffer.read())
+    sys.exit(int(os.environ.get('STUB_EXIT', '0')))
+''')
+
+
+@pytest.fixture
+def john(tmp_path, monkeypatch):
+    script = tmp_path / 'john'
+    script.write_text(f"#!{sys.executable}\n{STUB}")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('STUB_ARGS', str(tmp_path / 'args'))
+    monkeypatch.setenv('STUB_STDIN', str(tmp_path / 'stdin'))
+    generator = Sherluck()
+    generator.john_binary = str(script)
+    return generator, tmp_path
+
+
+def test_candidates_arrive_on_stdin(john):
+    generator, tmp_path = john
+    words = ['alpha', 'beta', 'caf\udce9'] + [f"word{i}" for i in range(20000)]
+    assert generator.run_john_pipe(iter(words), ['hashes.txt'], format_type='raw-md5') == len(words)
+    expected = ('\n'.join(words) + '\n').encode('utf-8', 'surrogateescape')
+    assert (tmp_path / 'stdin').read_bytes() == expected
+    assert (tmp_path / 'args').read_text().split('\n') == ['--stdin', '--format=raw-md5', 'hashes.txt']
+
+
+def test_rules_use_pipe_mode(john):
+    generator, tmp_path = john
+    generator.run_john_pipe(iter(['alpha']), ['hashes.txt'], rules=True)
+    assert (tmp_path / 'args').read_text().split('\n') == ['--pipe', '--rules', 'hashes.txt']
+
+
+def test_nonzero_exit_is_reported(john, monkeypatch, capsys):
+    generator, tmp_path = john
+    monkeypatch.setenv('STUB_EXIT', '3')
+    assert generator.run_john_pipe(iter(['alpha', 'beta']), ['hashes.txt']) == 2
+    assert 'exit status 3' in capsys.readouterr().out
+
+
+def test_broken_pipe_stops_generation(john, monkeypatch, capsys):
+    generator, tmp_path = john
+    monkeypatch.setenv('STUB_READ', '0')
+    closed = []
+    
+    def words():
+        try:
+            for i in range(10 ** 6):
+                yield f"candidate{i:012d}"
+        finally:
+            closed.append(True)
+    
+    fed = generator.run_john_pipe(words(), ['hashes.txt'])
+    assert closed
+    assert fed < 10 ** 6
+    assert 'closed its input early' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('output', ['-', 'out.txt.gz'])
+def test_john_rejects_unusable_output_before_generating(tmp_path, output):
+    template = os.path.join(os.path.dirname(__file__), os.pardir, 'sherluck_template.json')
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(template), 'sherluck.py'),
+                             '-i', template, '-o', output, '--john', '--john-target', 'hashes.txt'],
+                            cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 1
+    # With -o - the messages go to stderr
+    messages = result.stdout + result.stderr
+    assert 'Error: --john needs a single uncompressed wordlist file' in messages
+    assert '[+] Generating' not in messages
+    assert list(tmp_path.iterdir()) == []
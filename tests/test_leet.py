@@ -0,0 +1,24 @@
+import pytest
+
+from sherluck import LeetEngine
+
+
+def test_depth_one_is_unchanged():
+    assert LeetEngine(1, 8).variations('amir') == ('amir', 'AMIR', 'Amir', '@mir', 'am1r', 'Am1r', '@m1r', '4mir')
+
+
+@pytest.mark.parametrize('depth, deepest', [(2, '@|\\/|ir'), (3, '@|\\/|1r')])
+def test_deeper_substitutions_fit_the_default_budget(depth, deepest):
+    variations = LeetEngine(depth, 8).variations('amir')
+    assert len(variations) == 8
+    assert variations[:4] == ('amir', 'AMIR', 'Amir', '@mir')
+    assert deepest in variations
+
+
+def test_short_word_gives_unused_reservation_back():
+    assert len(LeetEngine(3, 8).variations('ab')) == 8
+
+
+def test_depth_without_room_is_rejected():
+    with pytest.raises(ValueError):
+        LeetEngine(3, 3)
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import REPO
+from sherluck import Sherluck
+
+
+def run(tmp_path, *args, input=os.path.join(REPO, 'sherluck_template.json')):
+    command = [sys.executable, os.path.join(REPO, 'sherluck.py'), '-i', input, '-m', '2000', *args]
+    return subprocess.run(command, cwd=tmp_path, capture_output=True, text=True)
+
+
+def test_manifest_only_on_request(tmp_path):
+    assert run(tmp_path, '-o', 'out.txt').returncode == 0
+    assert sorted(os.listdir(tmp_path)) == ['out.txt']
+    assert 'No manifest at out.txt.manifest.json' in run(tmp_path, '-o', 'out.txt', '--delta', 'new.txt').stdout
+
+    assert run(tmp_path, '-o', 'out.txt', '--manifest').returncode == 0
+    assert run(tmp_path, '-o', 'out.txt', '--delta', 'new.txt').returncode == 0
+    assert sorted(os.listdir(tmp_path)) == ['new.txt', 'out.txt', 'out.txt.manifest.json']
+
+
+def test_delta_beam_only_involves_new_keywords(tmp_path):
+    with open(os.path.join(REPO, 'sherluck_template.json')) as f:
+        profile = json.load(f)
+    first = tmp_path / 'first.json'
+    first.write_text(json.dumps(profile))
+    profile['friend_names'] = profile['friend_names'] + ['Quentin']
+    second = tmp_path / 'second.json'
+    second.write_text(json.dumps(profile))
+
+    options = ['-m', '5000', '--depth', '3', '-o', 'out.txt']
+    assert run(tmp_path, *options, '--manifest', input=str(first)).returncode == 0
+    assert run(tmp_path, *options, '--delta', 'new.txt', input=str(second)).returncode == 0
+
+    fresh = [word for word, _ in Sherluck().collect_variations([('Quentin', 1.0)])]
+    words = (tmp_path / 'new.txt').read_text().split('\n')[:-1]
+    assert words and all(any(variation in word for variation in fresh) for word in words)
+    # Beam combinations of three words made it in too
+    assert any(word.count('-') == 2 and 'Quentin' in word for word in words)
@@ -0,0 +1,14 @@
+from sherluck import Sherluck
+
+
+def test_date_patterns_do_not_push_out_other_numbers():
+    generator = Sherluck()
+    dates = ['1999-08-15']
+    numbers = generator.numeric_numbers(generator.dates.components(dates), generator.dates.patterns(dates))
+    assert numbers[:4] == ['1999', '15081999', '99', '1508']
+    assert {'08', '15', '0', '1'} <= set(numbers)
+    assert len(numbers) == len(set(numbers)) == 12
+
+
+def test_numbers_without_dates():
+    assert Sherluck.numeric_numbers(set()) == ['0', '1', '2', '3', '4', '5', '6', '7']
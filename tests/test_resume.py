@@ -0,0 +1,78 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import REPO
+from sherluck import GenerationCheckpoint, Sherluck
+
+MAX_WORDS = 60000
+# Beam search adds a deep stage after the combinations
+OPTIONS = dict(max_words=MAX_WORDS, depth=3, encoded=True)
+
+
+def interrupted(words, stop):
+    """Pass `words` through, then stop like ^C once `stop` words have gone by"""
+    count = 0
+    try:
+        for item in words:
+            yield item
+            count += item.count(b'\n') if isinstance(item, bytes) else 1
+            if count >= stop:
+                raise KeyboardInterrupt
+    finally:
+        words.close()
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+@pytest.mark.parametrize('stop', [20000, 45000, 58000])
+def test_resumed_run_matches_uninterrupted_run(profile, tmp_path, backend, stop):
+    generator = Sherluck()
+    full = tmp_path / 'full.txt'
+    generator.save_wordlist(generator.generate_wordlist(profile, backend=backend, **OPTIONS), str(full), MAX_WORDS)
+
+    output = str(tmp_path / 'out.txt')
+    fingerprint = GenerationCheckpoint.make_fingerprint(profile, {'backend': backend})
+    checkpoint = GenerationCheckpoint(output, fingerprint, interval=0)
+    words = generator.generate_wordlist(profile, backend=backend, checkpoint=checkpoint, **OPTIONS)
+    with pytest.raises(KeyboardInterrupt):
+        generator.save_wordlist(interrupted(words, stop), output, MAX_WORDS, checkpoint=checkpoint)
+
+    checkpoint = GenerationCheckpoint.load(output, fingerprint)
+    assert 0 < checkpoint.words <= stop
+    words = generator.generate_wordlist(profile, backend=backend, checkpoint=checkpoint, **OPTIONS)
+    assert generator.save_wordlist(words, output, MAX_WORDS, checkpoint=checkpoint) == MAX_WORDS
+    assert (tmp_path / 'out.txt').read_bytes() == full.read_bytes()
+    assert not (tmp_path / 'out.txt.ckpt').exists()
+
+
+def test_checkpoint_rejects_other_options(profile, tmp_path):
+    generator = Sherluck()
+    output = str(tmp_path / 'out.txt')
+    checkpoint = GenerationCheckpoint(output, 'a' * 32, interval=0)
+    words = generator.generate_wordlist(profile, checkpoint=checkpoint, **OPTIONS)
+    with pytest.raises(KeyboardInterrupt):
+        generator.save_wordlist(interrupted(words, 20000), output, MAX_WORDS, checkpoint=checkpoint)
+    with pytest.raises(ValueError, match='different profile or options'):
+        GenerationCheckpoint.load(output, 'b' * 32)
+
+
+def test_resume_refuses_another_max_words(tmp_path):
+    command = [sys.executable, os.path.join(REPO, 'sherluck.py'), '-i', os.path.join(REPO, 'sherluck_template.json'),
+               '-o', 'out.txt', '--checkpoint-every', '0.01']
+    process = subprocess.Popen(command + ['-m', '20000000'], cwd=tmp_path, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while not (tmp_path / 'out.txt.ckpt').exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.wait()
+    assert (tmp_path / 'out.txt.ckpt').exists()
+
+    result = subprocess.run(command + ['-m', '30000000', '--resume'], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 1
+    assert 'Error: cannot resume' in result.stdout and 'different profile or options' in result.stdout
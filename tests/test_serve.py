@@ -0,0 +1,77 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import REPO
+from sherluck import Sherluck
+
+
+class UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__('localhost', timeout=60)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+@pytest.fixture(scope='module')
+def post(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('serve') / 'sherluck.sock')
+    process = subprocess.Popen([sys.executable, os.path.join(REPO, 'sherluck.py'), '--serve', f"unix:{path}",
+                                '-m', '1000'], stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    def post(options):
+        connection = UnixConnection(path)
+        connection.request('POST', '/generate', json.dumps({'profile': {'firstname': 'Ann'}, 'options': options}))
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response.status, body
+    yield post
+    process.terminate()
+    process.wait()
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'backend': 'numpy', 'dedup': 'hash'}, 'dedup cannot be used with backend numpy'),
+    ({'backend': 'numpy', 'ranked': True}, 'does not support ranked output'),
+    ({'budget': True, 'ranked': True}, 'budget cannot be used with ranked'),
+])
+def test_conflicting_options_are_a_400(post, options, error):
+    status, body = post(options)
+    assert status == 400
+    assert error in json.loads(body)['error']
+
+
+def test_valid_options_stream_words(post):
+    status, body = post({'backend': 'numpy'})
+    assert status == 200
+    assert body.count(b'\n') == 1000
+
+
+def test_frozen_wordlists_are_only_read(tmp_path):
+    generator = Sherluck()
+    common = tmp_path / 'rockyou.txt'
+    common.write_text('alpha\nbravo\ncharlie\ndelta\n')
+    generator.open_wordlist_index('rockyou', str(common))
+    generator.wordlists_frozen = True
+
+    def download_wordlist(name, url):
+        raise AssertionError("frozen wordlists must not be downloaded or reopened")
+    generator.download_wordlist = download_wordlist
+    # Stale on disk, which would otherwise have the index rebuilt under a running request
+    common.write_text('echo\n')
+    assert list(generator.load_external_wordlists(['rockyou'], 3)) == ['alpha', 'bravo', 'charlie']
+    assert generator.common_capacity(['rockyou'], 3) == (3, 20)
+    assert generator.common_capacity(['rockyou'], 3, download=False) == (3, 20)
@@ -0,0 +1,59 @@
+import itertools
+
+import pytest
+
+import sherluck
+from sherluck import CandidateShard, LeetEngine, Sherluck
+
+PROFILE = {'firstname': 'Ann', 'lastname': 'Lee', 'pet_name': 'Rex'}
+ALL = 10 ** 7  # more than the profile has
+
+
+@pytest.fixture
+def generate(tmp_path):
+    common = tmp_path / 'common.txt'
+    common.write_text(''.join(f"common{i}\n" for i in range(5000)) + 'AnnLee\n')
+
+    def generate(max_words=ALL, shard=None, backend='python', depth=3):
+        generator = Sherluck()
+        generator.leet = LeetEngine(1, 2)
+        generator.download_wordlist = lambda name, url: str(common)
+        return list(generator.generate_wordlist(PROFILE, max_words, use_threading=False, include_common=True,
+                                                backend=backend, depth=depth, shard=shard))
+    return generate
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_shards_partition_the_output(generate, backend):
+    full = generate(backend=backend)
+    shards = [generate(shard=(index, 3), backend=backend) for index in range(3)]
+    for index, words in enumerate(shards):
+        assert words == list(itertools.compress(full, CandidateShard(index, 3).keep(full)))
+    assert sum(map(len, shards)) == len(full) == len(set().union(*shards))
+
+
+def test_backends_agree_on_shards(generate):
+    assert generate(shard=(1, 4), backend='python') == generate(shard=(1, 4), backend='numpy')
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_max_words_applies_per_shard(generate, backend):
+    whole = generate(shard=(0, 3), backend=backend, depth=2)
+    assert generate(5000, shard=(0, 3), backend=backend, depth=2) == whole[:5000]
+
+
+def test_invalid_shard(generate):
+    with pytest.raises(ValueError):
+        generate(shard=(3, 3))
+
+
+def test_shards_without_numpy(generate, monkeypatch):
+    with_numpy = [generate(shard=(index, 3)) for index in range(3)]
+
+    def missing(feature='--backend numpy'):
+        raise ValueError(f"{feature} needs the optional 'numpy' package (pip install numpy)")
+    monkeypatch.setattr(sherluck, '_import_numpy', missing)
+    full = generate()
+    shards = [generate(shard=(index, 3)) for index in range(3)]
+    assert sum(map(len, shards)) == len(full) == len(set().union(*shards))
+    assert shards == with_numpy
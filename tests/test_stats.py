@@ -0,0 +1,13 @@
+from sherluck import PipelineStats, Sherluck
+
+
+def test_stats_recorded_when_output_stops_at_max_words(profile, tmp_path):
+    generator = Sherluck()
+    stats = PipelineStats()
+    words = generator.generate_wordlist(profile, max_words=5000, stats=stats)
+    assert generator.save_wordlist(words, str(tmp_path / 'out.txt'), 5000) == 5000
+
+    report = stats.report()
+    assert report['emitted'] == 5000
+    assert report['stages']['output']['truncated'] == 1
+    assert report['stages']['numeric']['seconds'] > 0
@@ -0,0 +1,26 @@
+import hashlib
+
+from sherluck import HashVerifier
+
+
+def verifier(tmp_path, *words):
+    hashes = tmp_path / 'hashes.txt'
+    hashes.write_text(''.join(hashlib.md5(word.encode()).hexdigest() + '\n' for word in words))
+    verifier = HashVerifier('raw-md5', str(tmp_path / 'out.pot'))
+    verifier.load(str(hashes))
+    return verifier
+
+
+def test_watch_checks_only_words_within_limit(tmp_path):
+    checker = verifier(tmp_path, 'beta', 'delta')
+    watched = checker.watch(iter([b'alpha\nbeta\n', b'gamma\ndelta\n']), limit=3)
+    assert list(watched) == [b'alpha\nbeta\n', b'gamma\n']
+    assert checker.checked == 3
+    assert sorted(checker.cracked.values()) == ['beta']
+
+
+def test_watch_without_limit_checks_everything(tmp_path):
+    checker = verifier(tmp_path, 'beta', 'delta')
+    assert list(checker.watch(iter(['alpha', 'beta', 'gamma', 'delta']))) == ['alpha', 'beta', 'gamma', 'delta']
+    assert checker.checked == 4
+    assert sorted(checker.cracked.values()) == ['beta', 'delta']